@@ -3,21 +3,28 @@ import base64
 import json
 import logging
 import re
+import time
+from collections import deque
 from io import BytesIO
-from typing import Dict, List, Tuple, Optional, Any, Literal, Union
+from typing import Deque, Dict, List, Tuple, Optional, Any, Literal, Union
 from dataclasses import dataclass
 from enum import Enum
 
 import torch
-from transformers import AutoModelForImageTextToText, AutoProcessor
+import xxhash
+from transformers import AutoModelForImageTextToText, AutoProcessor, BatchFeature
+from transformers.models.qwen2_vl.image_processing_qwen2_vl import smart_resize
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from PIL import Image
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+
+import quantization as quant
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,6 +33,23 @@ logger = logging.getLogger(__name__)
 # Model configuration
 HF_MODEL_REPO = "Hcompany/Holo1-3B"
 
+# Number of past steps shown to the navigator
+HISTORY_WINDOW = 3
+
+# Actions that load a new document; the agent waits for it instead of sleeping
+NAVIGATION_ACTIONS = {"goto", "go_back", "refresh"}
+
+# Wheel deltas in pixels for each scroll direction
+SCROLL_DELTAS = {
+    "down": (0, 500),
+    "up": (0, -500),
+    "right": (500, 0),
+    "left": (-500, 0),
+}
+
+# Fallback for localization responses that are not valid JSON
+_COORD_RE = re.compile(r'"x"\s*:\s*(\d+)\s*,\s*"y"\s*:\s*(\d+)')
+
 # Pydantic models for structured outputs
 class ClickAction(BaseModel):
     """Click at specific coordinates on the screen."""
@@ -89,78 +113,195 @@ class NavigationStep(BaseModel):
     thought: str = Field(description="Reasoning about next steps (<4 lines)")
     action: ActionSpace = Field(description="Next action to take")
 
+# Output schemas are static, build them once rather than on every prompt
+_NAV_SCHEMA = NavigationStep.model_json_schema()
+_CLICK_SCHEMA_JSON = json.dumps(ClickAction.model_json_schema())
+
+# Placeholders for the per-step fields of the navigator's user turn
+_USER_SENTINELS = ("\x00task\x00", "\x00step\x00", "\x00history\x00")
+
 @dataclass
 class AgentMemory:
     task: str
-    screenshots: List[str] = None  # Base64 encoded screenshots
-    actions: List[NavigationStep] = None
+    screenshots: Deque[bytes] = None  # Raw PNG screenshots of the last HISTORY_WINDOW steps
+    history: Deque[str] = None  # Formatted entries for the last HISTORY_WINDOW steps
     current_url: str = ""
     step_count: int = 0
     
     def __post_init__(self):
         if self.screenshots is None:
-            self.screenshots = []
-        if self.actions is None:
-            self.actions = []
+            self.screenshots = deque(maxlen=HISTORY_WINDOW)
+        if self.history is None:
+            self.history = deque(maxlen=HISTORY_WINDOW)
+    
+    def record_step(self, step: NavigationStep):
+        """Remember an executed step for the navigator's history context"""
+        lines = [
+            f"Step {self.step_count}:",
+            f"Thought: {step.thought}",
+            f"Action: {step.action.action}",
+        ]
+        if step.note:
+            lines.append(f"Notes: {step.note}")
+        lines.append("---")
+        self.history.append("\n".join(lines))
+    
+    @property
+    def screenshots_b64(self) -> List[str]:
+        """Base64 encoded screenshots, built on demand"""
+        return [base64.b64encode(png).decode('utf-8') for png in self.screenshots]
 
 class Holo1Model:
     """Holo1 model for both localization and navigation tasks"""
     
-    def __init__(self, model_repo: str = HF_MODEL_REPO, device: str = "auto"):
+    def __init__(
+        self,
+        model_repo: str = HF_MODEL_REPO,
+        device: str = "auto",
+        compile_model: bool = True,
+        quantization: quant.Quantization = "bf16",
+    ):
+        """
+        Args:
+            model_repo: Hugging Face repo of the model
+            device: device_map passed to from_pretrained
+            compile_model: Whether to torch.compile the forward pass (CUDA only)
+            quantization: Weight format. bf16 is the fastest for single-screenshot decoding;
+                "int4-awq" expects model_repo to be an AWQ-quantized checkpoint and only pays off
+                when VRAM-bound; "int8" and "nf4" (bitsandbytes weight-only) save memory but are
+                slower than bf16 at batch size 1 because every matmul dequantizes its weights
+        """
+        if quantization not in quant.QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        
         self.model_repo = model_repo
         self.device = device
+        self.compile_model = compile_model
+        self.quantization = quantization
         self.model = None
         self.processor = None
+        # (image, processed image tensors) of the last screenshot seen
+        self._image_cache: Optional[Tuple[Any, Dict[str, torch.Tensor]]] = None
         self._load_model()
     
+    @staticmethod
+    def _select_dtype() -> Union[str, torch.dtype]:
+        """bf16 on CUDA (fp16 on GPUs without bf16 support), otherwise let transformers decide"""
+        if torch.cuda.is_available():
+            return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        return "auto"
+    
     def _load_model(self):
         """Load the Holo1 model and processor"""
-        logger.info(f"Loading model {self.model_repo}")
+        logger.info("Loading model %s (%s)", self.model_repo, self.quantization)
+        
+        if self.quantization in quant.BNB_CONFIGS:
+            logger.warning(
+                "%s weight-only quantization is slower than bf16 for batch-size-1 decoding; "
+                "use it only when the bf16 weights do not fit in memory", self.quantization
+            )
+        load_kwargs = quant.load_kwargs(self.quantization, self._select_dtype())
         
         self.model = AutoModelForImageTextToText.from_pretrained(
             self.model_repo,
-            torch_dtype="auto",
+            attn_implementation="sdpa",
             device_map=self.device,
+            **load_kwargs,
         )
+        self.model.eval()
+        quant.check_loaded(self.model, self.quantization, self.model_repo)
+        # Inputs go where the model (or its first shard under device_map="auto") lives
+        self._device = self.model.device
+        
+        # Compile the forward pass rather than the module: generate() looks up
+        # self.forward, so a compiled wrapper module would be bypassed
+        if self.compile_model and self.quantization == "bf16" and torch.cuda.is_available():
+            self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead", fullgraph=False)
         
         self.processor = AutoProcessor.from_pretrained(self.model_repo)
         logger.info("Model loaded successfully")
     
+    def resize_image(self, image: Image.Image) -> Image.Image:
+        """Resize image to the resolution the processor feeds the model, so predicted coordinates match the image"""
+        image_processor = self.processor.image_processor
+        height, width = smart_resize(
+            image.height,
+            image.width,
+            factor=image_processor.patch_size * image_processor.merge_size,
+            min_pixels=image_processor.min_pixels,
+            max_pixels=image_processor.max_pixels,
+        )
+        if (width, height) != image.size:
+            image = image.resize((width, height), resample=image_processor.resample)
+        return image.convert("RGB")
+    
+    def preprocess_image(self, image: Any) -> Dict[str, torch.Tensor]:
+        """Run the image processor once per screenshot; the navigator and localizer share the result"""
+        if self._image_cache is not None and self._image_cache[0] is image:
+            return self._image_cache[1]
+        
+        image_inputs = dict(self.processor.image_processor(images=[image], return_tensors="pt"))
+        self._image_cache = (image, image_inputs)
+        return image_inputs
+    
+    def _build_inputs(self, text: str, image: Any) -> BatchFeature:
+        """Tokenize a rendered prompt and attach the (cached) image tensors"""
+        image_inputs = self.preprocess_image(image)
+        
+        # Expand the image placeholder to one pad token per merged patch, as the processor does
+        merge_length = self.processor.image_processor.merge_size ** 2
+        num_image_tokens = int(image_inputs["image_grid_thw"][0].prod()) // merge_length
+        image_token = self.processor.image_token
+        text = text.replace(image_token, image_token * num_image_tokens, 1)
+        
+        text_inputs = self.processor.tokenizer([text], padding=True, return_tensors="pt")
+        return BatchFeature(data={**text_inputs, **image_inputs})
+    
     def run_inference(self, messages: List[Dict[str, Any]], image: Any, max_new_tokens: int = 128) -> str:
         """Run inference on the model"""
         try:
             # Preparation for inference
             text = self.processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-            inputs = self.processor(
-                text=[text],
-                images=[image],
-                padding=True,
-                return_tensors="pt",
-            )
-            
-            # Move to appropriate device
-            if torch.backends.mps.is_available():
-                inputs = inputs.to("mps")
-            elif torch.cuda.is_available():
-                inputs = inputs.to("cuda")
-            
-            generated_ids = self.model.generate(**inputs, max_new_tokens=max_new_tokens)
-            generated_ids_trimmed = [
-                out_ids[len(in_ids):] 
-                for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-            ]
+            inputs = self._build_inputs(text, image)
+            return self._generate(inputs, max_new_tokens)
             
-            response = self.processor.batch_decode(
-                generated_ids_trimmed, 
-                skip_special_tokens=True, 
-                clean_up_tokenization_spaces=False
-            )[0]
-            
-            return response.strip()
+        except Exception as e:
+            logger.error("Error in model inference: %s", e)
+            raise
+    
+    def run_inference_with_prefix(self, prefix_ids: torch.Tensor, text: str, image: Any, max_new_tokens: int = 128) -> str:
+        """Run inference on a rendered prompt whose leading part is already tokenized as prefix_ids"""
+        try:
+            inputs = self._build_inputs(text, image)
+            # The prefix is tokenized once but still prefilled on every call: Qwen2.5-VL's
+            # prepare_inputs_for_generation drops pixel_values whenever generation starts from
+            # a non-empty cache, so reusing a precomputed prefix KV cache would lose the screenshot
+            inputs["input_ids"] = torch.cat([prefix_ids, inputs["input_ids"]], dim=1)
+            inputs["attention_mask"] = torch.cat([torch.ones_like(prefix_ids), inputs["attention_mask"]], dim=1)
+            return self._generate(inputs, max_new_tokens)
             
         except Exception as e:
-            logger.error(f"Error in model inference: {e}")
+            logger.error("Error in model inference: %s", e)
             raise
+    
+    def _generate(self, inputs: Any, max_new_tokens: int) -> str:
+        """Generate from processed inputs and decode the new tokens"""
+        inputs = inputs.to(self._device, non_blocking=True)
+        
+        with torch.inference_mode():
+            generated_ids = self.model.generate(**inputs, max_new_tokens=max_new_tokens)
+        generated_ids_trimmed = [
+            out_ids[len(in_ids):] 
+            for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
+        ]
+        
+        response = self.processor.batch_decode(
+            generated_ids_trimmed, 
+            skip_special_tokens=True, 
+            clean_up_tokenization_spaces=False
+        )[0]
+        
+        return response.strip()
 
 class Holo1Localizer:
     """Holo1 Localization functionality"""
@@ -192,7 +333,7 @@ class Holo1Localizer:
         return [
             {
                 "role": "system",
-                "content": json.dumps(ClickAction.model_json_schema()),
+                "content": _CLICK_SCHEMA_JSON,
             },
             {
                 "role": "user",
@@ -228,13 +369,13 @@ class Holo1Localizer:
             
             if use_structured:
                 try:
-                    # First, try to parse the response as valid JSON
-                    action_data = json.loads(response)
-                    return (action_data["x"], action_data["y"])
-                except json.JSONDecodeError:
+                    # First, try to parse and validate the response as a ClickAction
+                    click = ClickAction.model_validate_json(response)
+                    return (click.x, click.y)
+                except ValidationError:
                     # If JSON parsing fails, fall back to regex to find coordinates
-                    logger.warning(f"Could not parse JSON: '{response}'. Falling back to regex.")
-                    match = re.search(r'"x":\s*(\d+),\s*"y":\s*(\d+)', response)
+                    logger.warning("Could not parse JSON: '%s'. Falling back to regex.", response)
+                    match = _COORD_RE.search(response)
                     if match:
                         x = int(match.group(1))
                         y = int(match.group(2))
@@ -251,7 +392,7 @@ class Holo1Localizer:
                     raise ValueError(f"Invalid coordinate format: {response}")
                     
         except Exception as e:
-            logger.error(f"Error localizing element '{element_description}': {e}")
+            logger.error("Error localizing element '%s': %s", element_description, e)
             raise
 
 class Holo1Navigator:
@@ -299,29 +440,40 @@ class Holo1Navigator:
     
     def __init__(self, model: Holo1Model):
         self.model = model
-    
-    def get_navigation_prompt(self, task: str, image: Any, memory: AgentMemory) -> List[Dict[str, Any]]:
-        """Get navigation prompt for deciding next actions"""
-        system_prompt = self.SYSTEM_PROMPT.format(
-            output_format=NavigationStep.model_json_schema(),
+        self._system_prompt = self.SYSTEM_PROMPT.format(
+            output_format=_NAV_SCHEMA,
             timestamp="2025-06-18 14:16:03",
         )
         
-        # Build history context
-        history_context = self._build_history_context(memory)
+        # The system turn never changes, so render and tokenize it once
+        self._system_text = model.processor.apply_chat_template(self._system_messages(), tokenize=False)
+        self._system_ids = model.processor.tokenizer(
+            self._system_text, add_special_tokens=False, return_tensors="pt"
+        ).input_ids
         
+        # Only task, step and history vary in the user turn, so render it once around
+        # sentinels and splice the per-step values in with plain string joins
+        self._user_segments = self._split_user_template()
+    
+    def _system_messages(self) -> List[Dict[str, Any]]:
+        """System turn of the navigation prompt"""
         return [
             {
                 "role": "system",
                 "content": [
-                    {"type": "text", "text": system_prompt},
+                    {"type": "text", "text": self._system_prompt},
                 ],
             },
+        ]
+    
+    def _user_messages(self, task: str, step: Any, history_context: str, image: Any) -> List[Dict[str, Any]]:
+        """User turn of the navigation prompt"""
+        return [
             {
                 "role": "user",
                 "content": [
                     {"type": "text", "text": f"<task>\n{task}\n</task>\n"},
-                    {"type": "text", "text": f"<observation step={memory.step_count}>\n"},
+                    {"type": "text", "text": f"<observation step={step}>\n"},
                     {"type": "text", "text": f"<history>\n{history_context}\n</history>\n"},
                     {"type": "text", "text": "<screenshot>\n"},
                     {
@@ -334,6 +486,52 @@ class Holo1Navigator:
             },
         ]
     
+    def _render_user_text(self, task: str, step: Any, history_context: str) -> Optional[str]:
+        """Render the user turn and generation prompt through the chat template"""
+        text = self.model.processor.apply_chat_template(
+            self._system_messages() + self._user_messages(task, step, history_context, None),
+            tokenize=False,
+            add_generation_prompt=True,
+        )
+        if not text.startswith(self._system_text):
+            return None
+        return text[len(self._system_text):]
+    
+    def _split_user_template(self) -> Optional[List[str]]:
+        """Split the rendered user turn into the literal segments around task, step and history"""
+        template = self._render_user_text(*_USER_SENTINELS)
+        if template is None:
+            return None
+        
+        segments = []
+        for sentinel in _USER_SENTINELS:
+            if template.count(sentinel) != 1:
+                return None
+            head, template = template.split(sentinel)
+            segments.append(head)
+        segments.append(template)
+        
+        # Check the spliced text against a real render once before trusting it
+        sample = ("task", 1, "history")
+        if self._join_user_segments(segments, *sample) != self._render_user_text(*sample):
+            logger.warning("Chat template is not static; rendering the navigation prompt per step")
+            return None
+        return segments
+    
+    @staticmethod
+    def _join_user_segments(segments: List[str], task: str, step: Any, history_context: str) -> str:
+        """Fill the pre-rendered user turn segments with the per-step values"""
+        return "".join((
+            segments[0], task, segments[1], str(step), segments[2], history_context, segments[3]
+        ))
+    
+    def get_navigation_prompt(self, task: str, image: Any, memory: AgentMemory) -> List[Dict[str, Any]]:
+        """Get navigation prompt for deciding next actions"""
+        # Build history context
+        history_context = self._build_history_context(memory)
+        
+        return self._system_messages() + self._user_messages(task, memory.step_count, history_context, image)
+    
     def decide_next_action(self, task: str, image: Any, memory: AgentMemory) -> NavigationStep:
         """
         Decide next action based on current state and memory
@@ -347,15 +545,23 @@ class Holo1Navigator:
             NavigationStep with next action to execute
         """
         try:
-            prompt = self.get_navigation_prompt(task, image, memory)
-            response = self.model.run_inference(prompt, image, max_new_tokens=256)
+            # Only the user turn needs tokenizing; the system turn ids are cached
+            if self._user_segments is not None:
+                user_text = self._join_user_segments(
+                    self._user_segments, task, memory.step_count, self._build_history_context(memory)
+                )
+                response = self.model.run_inference_with_prefix(
+                    self._system_ids, user_text, image, max_new_tokens=256
+                )
+            else:
+                prompt = self.get_navigation_prompt(task, image, memory)
+                response = self.model.run_inference(prompt, image, max_new_tokens=256)
             
-            # Parse JSON response
-            action_data = json.loads(response)
-            return NavigationStep(**action_data)
+            # Parse and validate the JSON response in one pass
+            return NavigationStep.model_validate_json(response)
             
         except Exception as e:
-            logger.error(f"Error deciding next action: {e}")
+            logger.error("Error deciding next action: %s", e)
             # Return a safe fallback action
             return NavigationStep(
                 note="Error occurred during decision making",
@@ -365,21 +571,10 @@ class Holo1Navigator:
     
     def _build_history_context(self, memory: AgentMemory) -> str:
         """Build context string from agent memory"""
-        if not memory.actions:
+        if not memory.history:
             return "No previous actions"
         
-        context_parts = []
-        
-        # Include last 3 actions for context
-        for i, step in enumerate(memory.actions[-3:]):
-            context_parts.append(f"Step {len(memory.actions) - 3 + i + 1}:")
-            context_parts.append(f"Thought: {step.thought}")
-            context_parts.append(f"Action: {step.action.action}")
-            if step.note:
-                context_parts.append(f"Notes: {step.note}")
-            context_parts.append("---")
-        
-        return "\n".join(context_parts)
+        return "\n".join(memory.history)
 
 class WebNavigationAgent:
     """Main agent that coordinates browser control with Holo1 models"""
@@ -408,6 +603,8 @@ class WebNavigationAgent:
         chrome_options.add_experimental_option('useAutomationExtension', False)
         
         self.driver = webdriver.Chrome(options=chrome_options)
+        # Wheel events are dispatched over the middle of the window
+        self._wheel_origin = (window_size[0] // 2, window_size[1] // 2)
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
     def cleanup(self):
@@ -415,51 +612,57 @@ class WebNavigationAgent:
         if self.driver:
             self.driver.quit()
     
-    def take_screenshot(self) -> Tuple[str, Image.Image]:
-        """Take screenshot and return as base64 string and PIL Image"""
-        screenshot_png = self.driver.get_screenshot_as_png()
-        screenshot_b64 = base64.b64encode(screenshot_png).decode('utf-8')
-        screenshot_image = Image.open(BytesIO(screenshot_png))
-        return screenshot_b64, screenshot_image
+    def _capture_png(self) -> bytes:
+        """Capture the viewport as PNG bytes"""
+        # Ask Chrome directly through CDP instead of the WebDriver screenshot endpoint
+        result = self.driver.execute_cdp_cmd(
+            "Page.captureScreenshot", {"format": "png", "captureBeyondViewport": False}
+        )
+        return base64.b64decode(result["data"])
+    
+    def take_screenshot(self, previous_hash: Optional[int] = None, retries: int = 3) -> Tuple[bytes, Image.Image, int]:
+        """
+        Take screenshot and return as raw PNG bytes, a PIL Image sized for the model and the PNG hash
+        
+        While the page is pixel-identical to previous_hash, wait briefly and capture again (up to
+        retries times) so the model is not asked again about an observation it has already seen
+        """
+        for attempt in range(retries + 1):
+            screenshot_png = self._capture_png()
+            screenshot_hash = xxhash.xxh3_64_intdigest(screenshot_png)
+            if screenshot_hash != previous_hash or attempt == retries:
+                break
+            time.sleep(0.5)
+        
+        screenshot_image = self.model.resize_image(Image.open(BytesIO(screenshot_png)))
+        return screenshot_png, screenshot_image, screenshot_hash
     
     def execute_action(self, step: NavigationStep, screenshot_image: Image.Image):
         """Execute a navigation step using Selenium"""
         action = step.action
-        logger.info(f"Executing action: {action.action}")
-        
-        if step.thought:
-            logger.info(f"Thought: {step.thought}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Executing action: %s", action.action)
+            if step.thought:
+                logger.debug("Thought: %s", step.thought)
         
         try:
             if action.action == "click_element":
-                # Use localizer to find coordinates
-                x, y = self.localizer.localize_element(screenshot_image, action.element)
+                x, y = self._element_coords(action, screenshot_image)
                 
                 # Click at coordinates
-                ActionChains(self.driver).move_by_offset(x, y).click().perform()
-                ActionChains(self.driver).move_by_offset(-x, -y).perform()  # Reset mouse position
+                self._click_at(x, y)
                 
             elif action.action == "write_element_abs":
-                # Use localizer to find coordinates
-                x, y = self.localizer.localize_element(screenshot_image, action.element)
+                x, y = self._element_coords(action, screenshot_image)
                 
                 # Click and then type
-                ActionChains(self.driver).move_by_offset(x, y).click().perform()
-                ActionChains(self.driver).send_keys(action.content).perform()
-                ActionChains(self.driver).move_by_offset(-x, -y).perform()
+                self._click_at(x, y, text=action.content)
                 
             elif action.action == "scroll":
-                if action.direction == "down":
-                    self.driver.execute_script("window.scrollBy(0, 500);")
-                elif action.direction == "up":
-                    self.driver.execute_script("window.scrollBy(0, -500);")
-                elif action.direction == "right":
-                    self.driver.execute_script("window.scrollBy(500, 0);")
-                elif action.direction == "left":
-                    self.driver.execute_script("window.scrollBy(-500, 0);")
+                self._scroll(*SCROLL_DELTAS[action.direction])
                     
             elif action.action == "wait":
-                asyncio.sleep(action.seconds)
+                time.sleep(action.seconds)
                 
             elif action.action == "goto":
                 self.driver.get(action.url)
@@ -473,13 +676,56 @@ class WebNavigationAgent:
             # Update memory with current URL
             self.memory.current_url = self.driver.current_url
             
-            # Wait a bit after action
-            asyncio.sleep(1)
+            if action.action in NAVIGATION_ACTIONS:
+                # Let the new page finish loading so the next decision sees it
+                self._wait_for_page_ready()
+            elif action.action != "wait":
+                # Wait a bit after action
+                time.sleep(1)
             
         except Exception as e:
-            logger.error(f"Error executing action {action.action}: {e}")
+            logger.error("Error executing action %s: %s", action.action, e)
             raise
     
+    def _element_coords(
+        self, action: Union[ClickElementAction, WriteElementAction], screenshot_image: Image.Image
+    ) -> Tuple[int, int]:
+        """Coordinates of the action's target element, localizing it only if the navigator's are unusable"""
+        # The navigator already emits coordinates; trusting them saves a second generate per click
+        if 0 <= action.x < screenshot_image.width and 0 <= action.y < screenshot_image.height:
+            return action.x, action.y
+        
+        logger.debug("Coordinates (%d, %d) fall outside the screenshot, localizing '%s'", action.x, action.y, action.element)
+        return self.localizer.localize_element(screenshot_image, action.element)
+    
+    def _click_at(self, x: int, y: int, text: Optional[str] = None):
+        """Click at absolute viewport coordinates, then optionally type text, in one WebDriver round-trip"""
+        actions = ActionChains(self.driver)
+        # An absolute move needs no cursor bookkeeping, so there is nothing to reset afterwards
+        actions.w3c_actions.pointer_action.move_to_location(x, y)
+        actions.w3c_actions.key_action.pause()
+        actions.click()
+        if text is not None:
+            actions.send_keys(text)
+        actions.perform()
+    
+    def _scroll(self, dx: int, dy: int):
+        """Scroll by dispatching a mouse wheel event through CDP rather than evaluating script"""
+        x, y = self._wheel_origin
+        self.driver.execute_cdp_cmd(
+            "Input.dispatchMouseEvent",
+            {"type": "mouseWheel", "x": x, "y": y, "deltaX": dx, "deltaY": dy},
+        )
+    
+    def _wait_for_page_ready(self, timeout: float = 5):
+        """Wait until the current document has finished loading"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+        except TimeoutException:
+            logger.warning("Page did not finish loading within %ss", timeout)
+    
     def run_task(self, task: str, starting_url: str = "https://www.google.com", max_steps: int = 30) -> str:
         """
         Run a task using the web navigation agent
@@ -494,19 +740,20 @@ class WebNavigationAgent:
         """
         self.memory = AgentMemory(task=task)
         
-        logger.info(f"Starting task: {task}")
+        logger.info("Starting task: %s", task)
         
         # Navigate to starting page
         self.driver.get(starting_url)
         self.memory.current_url = starting_url
+        screenshot_hash = None
         
         for step in range(max_steps):
-            logger.info(f"Step {step + 1}/{max_steps}")
+            logger.debug("Step %d/%d", step + 1, max_steps)
             self.memory.step_count = step + 1
             
             # Take screenshot of current state
-            screenshot_b64, screenshot_image = self.take_screenshot()
-            self.memory.screenshots.append(screenshot_b64)
+            screenshot_png, screenshot_image, screenshot_hash = self.take_screenshot(screenshot_hash)
+            self.memory.screenshots.append(screenshot_png)
             
             # Decide next action using navigator
             try:
@@ -514,17 +761,17 @@ class WebNavigationAgent:
                 
                 # Check if task is complete
                 if navigation_step.action.action == "answer":
-                    logger.info(f"Task completed with answer: {navigation_step.action.content}")
+                    logger.info("Task completed with answer: %s", navigation_step.action.content)
                     return navigation_step.action.content
                 
                 # Execute the action
                 self.execute_action(navigation_step, screenshot_image)
                 
                 # Store step in memory
-                self.memory.actions.append(navigation_step)
+                self.memory.record_step(navigation_step)
                     
             except Exception as e:
-                logger.error(f"Error in step {step + 1}: {e}")
+                logger.error("Error in step %d: %s", step + 1, e)
                 # Continue to next step
                 continue
         
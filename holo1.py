@@ -1,6 +1,9 @@
-from web_agent import WebBrowsingAgent  # Your existing agent
+from web_agent import WebBrowsingAgent, configure_cuda_allocator, configure_logging  # Your existing agent
 from playwright_controller import PlaywrightWebAgent
 
+configure_cuda_allocator()
+configure_logging()
+
 # Initialize the agent
 agent = WebBrowsingAgent()
 playwright_agent = PlaywrightWebAgent(
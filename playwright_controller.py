@@ -1,18 +1,193 @@
 import asyncio
+import atexit
+import copy
+import functools
 import io
 import time
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, Callable, List, Tuple
 from PIL import Image
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
-from playwright.sync_api import sync_playwright, Browser as SyncBrowser, BrowserContext as SyncBrowserContext, Page as SyncPage
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError, sync_playwright, Browser as SyncBrowser, BrowserContext as SyncBrowserContext, Page as SyncPage
 import json
+import logging
+import multiprocessing
 import os
+import re
+import threading
 from pathlib import Path
+from urllib.parse import urlparse
+import zlib
 
-class PlaywrightBrowserController:
+logger = logging.getLogger(__name__)
+
+# Browsers shared by the sync controllers of one thread, in .pool keyed by launch
+# configuration, and the thread's Playwright instance in .playwright. Sync Playwright
+# objects only work on the thread that started them, so every thread gets its own.
+# Launching a browser takes hundreds of milliseconds; a new context is nearly free.
+_SYNC_LOCAL = threading.local()
+
+
+def close_browser_pool():
     """
-    Playwright-based browser controller for the web browsing agent.
-    Supports both async and sync operations.
+    Close the calling thread's pooled browsers and stop its Playwright instance.
+    
+    The main thread's pool is closed at interpreter exit; other threads that used
+    a sync controller should call this before they finish.
+    """
+    pool: Dict[Tuple[str, bool, int, bool], SyncBrowser] = getattr(_SYNC_LOCAL, "pool", {})
+    for browser in pool.values():
+        try:
+            browser.close()
+        except Exception as e:
+            logger.warning("Error closing browser: %s", e)
+    pool.clear()
+    
+    playwright = getattr(_SYNC_LOCAL, "playwright", None)
+    if playwright is not None:
+        playwright.stop()
+        _SYNC_LOCAL.playwright = None
+
+
+atexit.register(close_browser_pool)
+
+
+# Counts DOM mutations and finished resource loads so an unchanged page can reuse its last
+# screenshot. Loads are counted by an observer: the resource timing buffer stops growing
+# at 250 entries, after which getEntriesByType("resource") no longer changes
+_MUTATION_COUNTER_SCRIPT = """
+window.__mutCount = 0;
+window.__resCount = 0;
+new MutationObserver(() => { window.__mutCount++; }).observe(document, {
+    subtree: true, childList: true, attributes: true, characterData: true
+});
+new PerformanceObserver(list => { window.__resCount += list.getEntries().length; })
+    .observe({type: "resource", buffered: true});
+"""
+
+# What changes the viewport, fetched in one round-trip: the URL, scroll position, finished
+# resource loads (images fill in without mutating the DOM) and the mutation count.
+# Canvas, video and CSS animations are not tracked.
+_FINGERPRINT_SCRIPT = """() => [
+    location.href, window.scrollX, window.scrollY, window.__resCount, window.__mutCount
+]"""
+
+
+# Page info and, optionally, the element under a point, fetched in one round-trip
+_STATE_SCRIPT = """([x, y]) => {
+    const element = x === null ? null : document.elementFromPoint(x, y);
+    return {
+        url: location.href,
+        title: document.title,
+        viewport: {width: window.innerWidth, height: window.innerHeight},
+        element: element ? {
+            tagName: element.tagName,
+            className: element.className,
+            id: element.id,
+            textContent: element.textContent?.substring(0, 100),
+            href: element.href,
+            type: element.type,
+            value: element.value,
+            placeholder: element.placeholder
+        } : null
+    };
+}"""
+
+
+# Cookie consent buttons, matched by attribute or by accessible name
+_COOKIE_SELECTORS = [
+    '[id*="accept"]',
+    '[class*="accept"]',
+    '[data-testid*="accept"]',
+]
+# The lookahead skips refusals such as "Don't allow" or "Do not accept"
+_COOKIE_BUTTON_NAME = re.compile(r"^(?!.*\b(?:don['’]?t|not)\b).*\b(accept|allow|agree|ok)\b", re.IGNORECASE)
+
+
+# Chromium flags for automation: skip first-run work and keep background pages at full speed
+_CHROMIUM_ARGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    # Site isolation stays on: the agent browses arbitrary sites, possibly with a logged-in profile
+    "--disable-features=TranslateUI",
+    "--disable-ipc-flooding-protection",
+    "--mute-audio",
+]
+
+# Resource types aborted when block_resources is set; stylesheets load for layout fidelity
+_BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+
+# Resolves after the next frame has been rendered
+_FRAME_FENCE_SCRIPT = "() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))"
+
+
+# Scrolls programmatically, without dispatching wheel events, then waits for the next frame
+_SCROLL_SCRIPT = """([x, y]) => {
+    window.scrollBy(x, y);
+    return new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+}"""
+
+# Unit scroll vector for each direction
+_SCROLL_DIRECTIONS = {
+    "down": (0, 1),
+    "up": (0, -1),
+    "right": (1, 0),
+    "left": (-1, 0),
+}
+
+
+def _save_webp(png_bytes: bytes, filepath: str):
+    """Re-encode a PNG screenshot as WebP; UI screenshots show no visible loss at q75."""
+    Image.open(io.BytesIO(png_bytes)).save(filepath, "WEBP", quality=75, method=4)
+
+
+def _cookie_locator(page) -> Any:
+    """One locator for the first visible cookie consent button on the page."""
+    return (
+        page.locator(", ".join(_COOKIE_SELECTORS))
+        .or_(page.get_by_role("button", name=_COOKIE_BUTTON_NAME))
+        .filter(visible=True)
+        .first
+    )
+
+
+def _screenshot_options(fmt: str, quality: int) -> Dict[str, Any]:
+    """Playwright screenshot options for the given format; JPEG is several times smaller than PNG."""
+    if fmt == "jpeg":
+        return {"type": "jpeg", "quality": quality}
+    elif fmt == "png":
+        return {"type": "png"}
+    else:
+        raise ValueError(f"Unsupported screenshot format: {fmt}")
+
+
+def _requires_browser(fn):
+    """Initialize the controller on first use before running the wrapped method."""
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(self, *args, **kwargs):
+            if not self.is_initialized:
+                await self.initialize()
+            return await fn(self, *args, **kwargs)
+        return async_wrapper
+    
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if not self.is_initialized:
+            self.initialize()
+        return fn(self, *args, **kwargs)
+    return wrapper
+
+
+class _PlaywrightControllerBase:
+    """
+    Configuration and launch options shared by the sync and async controllers.
     """
     
     def __init__(self, 
@@ -20,7 +195,11 @@ class PlaywrightBrowserController:
                  browser_type: str = "chromium",
                  viewport_size: Dict[str, int] = None,
                  user_agent: str = None,
-                 slow_mo: int = 0):
+                 slow_mo: int = 0,
+                 block_resources: bool = False,
+                 allowed_hosts: List[str] = None,
+                 user_data_dir: str = None,
+                 use_wheel_events: bool = False):
         """
         Initialize the Playwright browser controller.
         
@@ -30,12 +209,25 @@ class PlaywrightBrowserController:
             viewport_size: Viewport dimensions {'width': 1280, 'height': 720}
             user_agent: Custom user agent string
             slow_mo: Slow down operations by specified milliseconds
+            block_resources: Abort image, media and font requests. Off by default since
+                the agent decides from screenshots.
+            allowed_hosts: Hosts (and their subdomains) whose resources are never blocked
+            user_data_dir: Profile directory kept between runs. The browser is then launched
+                with a persistent context instead of being shared.
+            use_wheel_events: Scroll with synthetic mouse wheel events, for sites that only
+                react to real wheel input, instead of window.scrollBy
         """
         self.headless = headless
         self.browser_type = browser_type
         self.viewport_size = viewport_size or {"width": 1280, "height": 720}
+        self._viewport_tuple = (self.viewport_size["width"], self.viewport_size["height"])
+        self._blank_fallback = Image.new("RGB", self._viewport_tuple, color="white")
         self.user_agent = user_agent
         self.slow_mo = slow_mo
+        self.block_resources = block_resources
+        self.allowed_hosts = allowed_hosts or []
+        self.user_data_dir = user_data_dir
+        self.use_wheel_events = use_wheel_events
         
         # Browser instances
         self.playwright = None
@@ -48,351 +240,881 @@ class PlaywrightBrowserController:
         self.current_url = ""
         self.page_load_timeout = 30000  # 30 seconds
         
+        # Last capture, keyed by page fingerprint and format
+        self._screenshot_cache = None
+        self._last_image = None
+        
+        # Page state of the current step, keyed by queried coordinates; each entry
+        # holds the page fingerprint it was read at
+        self._state_cache = {}
+        
+        # Read by the page's single dialog listener; dialogs are dismissed until
+        # handle_dialog says otherwise, like Playwright does without a listener
+        self._dialog_cfg = {"accept": False, "prompt_text": ""}
+    
+    def handle_dialog(self, accept: bool = True, prompt_text: str = ""):
+        """Configure how alerts, confirms and prompts are answered."""
+        self._dialog_cfg["accept"] = accept
+        self._dialog_cfg["prompt_text"] = prompt_text
+    
+    def _invalidate_page_cache(self):
+        """Drop the cached screenshot and page state after an action that may change the page."""
+        self._screenshot_cache = None
+        self._state_cache = {}
+    
+    def _cached_state(self, key: Optional[tuple], fingerprint: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        """Return the state read at key if the page fingerprint has not changed since."""
+        if fingerprint is None or fingerprint[-1] is None:
+            return None
+        cached = self._state_cache.get(key)
+        if cached is None or cached[0] != fingerprint:
+            return None
+        return cached[1]
+    
+    def _cached_screenshot(self, fingerprint: Optional[tuple], fmt: str, quality: int) -> Optional[bytes]:
+        """Return the last capture if the page fingerprint has not changed since it was taken."""
+        if self._screenshot_cache is None or fingerprint is None:
+            return None
+        key, screenshot_bytes = self._screenshot_cache
+        return screenshot_bytes if key == (fingerprint, fmt, quality) else None
+    
+    def _store_screenshot(self, fingerprint: Optional[tuple], fmt: str, quality: int, screenshot_bytes: bytes):
+        """Remember a capture; pages without the mutation counter are never cached."""
+        # A fresh capture means the page may have changed since the state was read
+        self._state_cache = {}
+        if fingerprint is None or fingerprint[-1] is None:
+            self._screenshot_cache = None
+        else:
+            self._screenshot_cache = ((fingerprint, fmt, quality), screenshot_bytes)
+    
+    def _image_for(self, screenshot_bytes: bytes) -> Image.Image:
+        """Wrap screenshot bytes in a PIL image, reusing the last one for a cached capture."""
+        if self._last_image is None or self._last_image[0] is not screenshot_bytes:
+            # Image.open only reads the header; pixels are decoded when first used
+            self._last_image = (screenshot_bytes, Image.open(io.BytesIO(screenshot_bytes)))
+        return self._last_image[1]
+    
+    def _should_block(self, request) -> bool:
+        """Whether a request is a non-essential resource outside the allowed hosts."""
+        if request.resource_type not in _BLOCKED_RESOURCE_TYPES:
+            return False
+        host = urlparse(request.url).hostname or ""
+        return not any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts)
+    
+    def _browser_launcher(self):
+        """Select the browser type to launch from the running Playwright instance."""
+        if self.browser_type == "chromium":
+            return self.playwright.chromium
+        elif self.browser_type == "firefox":
+            return self.playwright.firefox
+        elif self.browser_type == "webkit":
+            return self.playwright.webkit
+        else:
+            raise ValueError(f"Unsupported browser type: {self.browser_type}")
+    
+    @property
+    def _disable_images(self) -> bool:
+        """Turn images off browser-wide; only when no host is allowed to load them."""
+        return self.block_resources and not self.allowed_hosts
+    
+    def _launch_options(self) -> Dict[str, Any]:
+        """Options passed to the browser launcher."""
+        args = []
+        if self.browser_type == "chromium":
+            args = list(_CHROMIUM_ARGS)
+            if os.getenv("CI"):
+                args.append("--no-sandbox")
+            if self.headless:
+                # Nothing is shown, so skip GPU process start-up; headed windows keep compositing on the GPU
+                args.append("--disable-gpu")
+            if self._disable_images:
+                args.append("--blink-settings=imagesEnabled=false")
+        
+        return {
+            "headless": self.headless,
+            "slow_mo": self.slow_mo,
+            "args": args,
+        }
+    
+    def _context_options(self) -> Dict[str, Any]:
+        """Options passed when creating a browser context."""
+        context_options = {
+            "viewport": self.viewport_size,
+            "ignore_https_errors": True,
+        }
+        
+        if self.user_agent:
+            context_options["user_agent"] = self.user_agent
+        
+        return context_options
+
+
+class PlaywrightBrowserController(_PlaywrightControllerBase):
+    """
+    Playwright-based browser controller for the web browsing agent.
+    Synchronous API; see AsyncPlaywrightBrowserController for the async one.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        # Sync Playwright cannot run on a thread with a running event loop (e.g. Jupyter)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "PlaywrightBrowserController cannot be used inside a running event loop; "
+                "use AsyncPlaywrightBrowserController instead"
+            )
+        super().__init__(*args, **kwargs)
+    
+    def _ensure_browser(self):
+        """Launch the browser, or reuse the pooled one with the same launch configuration."""
+        if getattr(_SYNC_LOCAL, "playwright", None) is None:
+            _SYNC_LOCAL.playwright = sync_playwright().start()
+            _SYNC_LOCAL.pool = {}
+        self.playwright = _SYNC_LOCAL.playwright
+        
+        # A persistent profile launches its own browser together with its context
+        if self.user_data_dir or (self.browser is not None and self.browser.is_connected()):
+            return
+        
+        key = (self.browser_type, self.headless, self.slow_mo, self._disable_images)
+        browser = _SYNC_LOCAL.pool.get(key)
+        if browser is None or not browser.is_connected():
+            browser = self._browser_launcher().launch(**self._launch_options())
+            _SYNC_LOCAL.pool[key] = browser
+        self.browser = browser
+    
+    def _route_request(self, route):
+        """Abort blocked resource requests and let everything else through."""
+        if self._should_block(route.request):
+            route.abort()
+        else:
+            route.continue_()
+    
+    def _new_context(self):
+        """Create a fresh context and page in the current browser or the persistent profile."""
+        if self.user_data_dir:
+            self.context = self._browser_launcher().launch_persistent_context(
+                self.user_data_dir, **self._launch_options(), **self._context_options()
+            )
+        else:
+            self.context = self.browser.new_context(**self._context_options())
+        self.context.add_init_script(_MUTATION_COUNTER_SCRIPT)
+        if self.block_resources:
+            self.context.route("**/*", self._route_request)
+        # A persistent context opens with a blank page already
+        self.page = self.context.pages[0] if self.context.pages else self.context.new_page()
+        self.page.set_default_timeout(self.page_load_timeout)
+        self.page.on("dialog", self._on_dialog)
+        self._cookie_locator = _cookie_locator(self.page)
+        self._invalidate_page_cache()
+    
     def initialize(self):
         """Initialize the browser (sync version)."""
         if self.is_initialized:
             return
             
         try:
-            self.playwright = sync_playwright().start()
-            
-            # Select browser
-            if self.browser_type == "chromium":
-                browser_launcher = self.playwright.chromium
-            elif self.browser_type == "firefox":
-                browser_launcher = self.playwright.firefox
-            elif self.browser_type == "webkit":
-                browser_launcher = self.playwright.webkit
-            else:
-                raise ValueError(f"Unsupported browser type: {self.browser_type}")
-            
-            # Launch browser
-            self.browser = browser_launcher.launch(
-                headless=self.headless,
-                slow_mo=self.slow_mo,
-                args=[
-                    "--no-first-run",
-                    "--no-default-browser-check",
-                    "--disable-dev-shm-usage",
-                    "--disable-extensions",
-                    "--no-sandbox" if os.getenv("CI") else "",
-                ] if self.browser_type == "chromium" else []
-            )
-            
-            # Create context
-            context_options = {
-                "viewport": self.viewport_size,
-                "ignore_https_errors": True,
-            }
-            
-            if self.user_agent:
-                context_options["user_agent"] = self.user_agent
-                
-            self.context = self.browser.new_context(**context_options)
-            
-            # Create page
-            self.page = self.context.new_page()
-            self.page.set_default_timeout(self.page_load_timeout)
+            self._ensure_browser()
+            self._new_context()
             
             self.is_initialized = True
-            print(f"Playwright browser ({self.browser_type}) initialized successfully")
+            logger.info("Playwright browser (%s) initialized successfully", self.browser_type)
             
         except Exception as e:
-            print(f"Failed to initialize browser: {e}")
+            logger.warning("Failed to initialize browser: %s", e)
             self.cleanup()
             raise
     
     def cleanup(self):
-        """Clean up browser resources."""
+        """Close this controller's context; the pooled browser stays up for the next task
+        until close_browser_pool() is called on this thread."""
         try:
-            if self.page:
-                self.page.close()
             if self.context:
+                # Closing the context closes its pages too
                 self.context.close()
-            if self.browser:
-                self.browser.close()
-            if self.playwright:
-                self.playwright.stop()
         except Exception as e:
-            print(f"Error during cleanup: {e}")
+            logger.warning("Error during cleanup: %s", e)
         finally:
             self.page = None
             self.context = None
-            self.browser = None
-            self.playwright = None
             self.is_initialized = False
     
+    def _page_fingerprint(self) -> Optional[tuple]:
+        """Fingerprint of what the viewport shows, or None if the page cannot be queried."""
+        try:
+            return tuple(self.page.evaluate(_FINGERPRINT_SCRIPT))
+        except Exception:
+            return None
+    
+    @_requires_browser
+    def get_screenshot_bytes(self, fmt: str = "jpeg", quality: int = 70, compress: bool = False) -> bytes:
+        """
+        Get current screenshot as encoded bytes, without decoding it.
+        
+        Args:
+            fmt: Image format, 'jpeg' or 'png'
+            quality: JPEG quality (ignored for PNG)
+            compress: zlib-compress the bytes for storage, e.g. PNG frames kept in a
+                cache; zlib.decompress them before use
+        """
+        fingerprint = self._page_fingerprint()
+        screenshot_bytes = self._cached_screenshot(fingerprint, fmt, quality)
+        if screenshot_bytes is None:
+            screenshot_bytes = self.page.screenshot(full_page=False, **_screenshot_options(fmt, quality))
+            self._store_screenshot(fingerprint, fmt, quality, screenshot_bytes)
+        
+        if compress:
+            return zlib.compress(screenshot_bytes, 1)
+        return screenshot_bytes
+    
     def get_screenshot(self) -> Image.Image:
         """Get current screenshot as PIL Image."""
-        if not self.is_initialized:
-            self.initialize()
-            
         try:
-            screenshot_bytes = self.page.screenshot(full_page=False, type="png")
-            return Image.open(io.BytesIO(screenshot_bytes))
+            return self._image_for(self.get_screenshot_bytes())
         except Exception as e:
-            print(f"Failed to get screenshot: {e}")
+            logger.warning("Failed to get screenshot: %s", e)
             # Return a blank image as fallback
-            return Image.new('RGB', self.viewport_size.values(), color='white')
+            return self._blank_fallback.copy()
     
-    def click(self, x: int, y: int, delay: float = 0.1):
+    @_requires_browser
+    def click(self, x: int, y: int, delay: float = 0):
         """Click at coordinates (x, y)."""
-        if not self.is_initialized:
-            self.initialize()
-            
+        self._invalidate_page_cache()
         try:
             # Use mouse click for precise coordinates
             self.page.mouse.click(x, y)
-            time.sleep(delay)
-            print(f"Clicked at coordinates ({x}, {y})")
+            # The next action waits for whatever it needs; only pace clicks when asked to
+            if delay:
+                time.sleep(delay)
+            logger.debug("Clicked at coordinates (%s, %s)", x, y)
         except Exception as e:
-            print(f"Failed to click at ({x}, {y}): {e}")
+            logger.warning("Failed to click at (%s, %s): %s", x, y, e)
     
-    def type_text(self, text: str, delay: float = 0.05):
-        """Type text at current cursor position."""
-        if not self.is_initialized:
-            self.initialize()
-            
+    @_requires_browser
+    def type_text(self, text: str, delay: float = 0.05, human: bool = False):
+        """
+        Type text at current cursor position.
+        
+        By default the text is inserted with a single input event, without per-key
+        keydown/keyup events. Pass human=True for fields that react to individual keys.
+        
+        Args:
+            text: Text to type
+            delay: Delay between keystrokes in seconds when typing key by key
+            human: Type key by key instead of inserting the text at once
+        """
+        self._invalidate_page_cache()
         try:
-            # Type with realistic delay between keystrokes
-            self.page.keyboard.type(text, delay=int(delay * 1000))
-            print(f"Typed text: '{text}'")
+            if human:
+                # Type with realistic delay between keystrokes
+                self.page.keyboard.type(text, delay=int(delay * 1000))
+            else:
+                self.page.keyboard.insert_text(text)
+            logger.debug("Typed text: '%s'", text)
         except Exception as e:
-            print(f"Failed to type text '{text}': {e}")
+            logger.warning("Failed to type text '%s': %s", text, e)
     
+    @_requires_browser
     def press_key(self, key: str):
         """Press a specific key."""
-        if not self.is_initialized:
-            self.initialize()
-            
+        self._invalidate_page_cache()
         try:
             self.page.keyboard.press(key)
-            print(f"Pressed key: {key}")
+            logger.debug("Pressed key: %s", key)
         except Exception as e:
-            print(f"Failed to press key '{key}': {e}")
+            logger.warning("Failed to press key '%s': %s", key, e)
     
+    @_requires_browser
     def scroll(self, direction: str, amount: int = 500):
         """Scroll in given direction."""
-        if not self.is_initialized:
-            self.initialize()
-            
+        self._invalidate_page_cache()
         try:
-            if direction.lower() == "down":
-                self.page.mouse.wheel(0, amount)
-            elif direction.lower() == "up":
-                self.page.mouse.wheel(0, -amount)
-            elif direction.lower() == "right":
-                self.page.mouse.wheel(amount, 0)
-            elif direction.lower() == "left":
-                self.page.mouse.wheel(-amount, 0)
-            else:
-                print(f"Unknown scroll direction: {direction}")
+            if direction.lower() not in _SCROLL_DIRECTIONS:
+                logger.warning("Unknown scroll direction: %s", direction)
                 return
-                
-            time.sleep(0.5)  # Wait for scroll to complete
-            print(f"Scrolled {direction} by {amount} pixels")
+            
+            x, y = _SCROLL_DIRECTIONS[direction.lower()]
+            dx, dy = x * amount, y * amount
+            if self.use_wheel_events:
+                self.page.mouse.wheel(dx, dy)
+                # Wait for the scrolled frame to be painted
+                self.page.evaluate(_FRAME_FENCE_SCRIPT)
+            else:
+                # Scroll and wait for the painted frame in one round-trip
+                self.page.evaluate(_SCROLL_SCRIPT, [dx, dy])
+            logger.debug("Scrolled %s by %s pixels", direction, amount)
             
         except Exception as e:
-            print(f"Failed to scroll {direction}: {e}")
+            logger.warning("Failed to scroll %s: %s", direction, e)
+    
+    def _wait_for_target(self, selector: Optional[str]):
+        """Wait for the element the caller needs after a navigation, if one was given."""
+        if selector:
+            self.page.wait_for_selector(selector, state="visible")
     
-    def go_back(self):
+    @_requires_browser
+    def go_back(self, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
         """Navigate back in browser history."""
-        if not self.is_initialized:
-            self.initialize()
-            
+        self._invalidate_page_cache()
         try:
-            self.page.go_back(wait_until="networkidle")
+            self.page.go_back(wait_until=wait_until)
+            self._wait_for_target(wait_for)
             self.current_url = self.page.url
-            print("Navigated back")
+            logger.debug("Navigated back")
         except Exception as e:
-            print(f"Failed to go back: {e}")
+            logger.warning("Failed to go back: %s", e)
     
-    def go_forward(self):
+    @_requires_browser
+    def go_forward(self, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
         """Navigate forward in browser history."""
-        if not self.is_initialized:
-            self.initialize()
-            
+        self._invalidate_page_cache()
         try:
-            self.page.go_forward(wait_until="networkidle")
+            self.page.go_forward(wait_until=wait_until)
+            self._wait_for_target(wait_for)
             self.current_url = self.page.url
-            print("Navigated forward")
+            logger.debug("Navigated forward")
         except Exception as e:
-            print(f"Failed to go forward: {e}")
+            logger.warning("Failed to go forward: %s", e)
     
-    def refresh(self):
+    @_requires_browser
+    def refresh(self, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
         """Refresh current page."""
-        if not self.is_initialized:
-            self.initialize()
-            
+        self._invalidate_page_cache()
         try:
-            self.page.reload(wait_until="networkidle")
-            print("Page refreshed")
+            self.page.reload(wait_until=wait_until)
+            self._wait_for_target(wait_for)
+            logger.debug("Page refreshed")
         except Exception as e:
-            print(f"Failed to refresh page: {e}")
+            logger.warning("Failed to refresh page: %s", e)
     
-    def goto(self, url: str, wait_until: str = "networkidle"):
+    @_requires_browser
+    def goto(self, url: str, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
         """Navigate to URL."""
-        if not self.is_initialized:
-            self.initialize()
-            
+        self._invalidate_page_cache()
         try:
             # Ensure URL has protocol
             if not url.startswith(("http://", "https://")):
                 url = "https://" + url
                 
             self.page.goto(url, wait_until=wait_until)
+            self._wait_for_target(wait_for)
             self.current_url = self.page.url
-            print(f"Navigated to: {url}")
+            logger.debug("Navigated to: %s", url)
             
         except Exception as e:
-            print(f"Failed to navigate to {url}: {e}")
+            logger.warning("Failed to navigate to %s: %s", url, e)
     
     def restart(self):
-        """Restart/reset browser state."""
-        print("Restarting browser...")
+        """Restart/reset browser state with a fresh context."""
+        logger.info("Restarting browser...")
         self.cleanup()
         self.initialize()
     
+    @_requires_browser
     def wait_for_element(self, selector: str, timeout: int = 5000) -> bool:
         """Wait for element to appear."""
-        if not self.is_initialized:
-            self.initialize()
-            
         try:
             self.page.wait_for_selector(selector, timeout=timeout)
             return True
         except Exception as e:
-            print(f"Element '{selector}' not found within {timeout}ms: {e}")
+            logger.warning("Element '%s' not found within %sms: %s", selector, timeout, e)
             return False
     
+    @_requires_browser
+    def get_state_batch(self, xy: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Get url, title, viewport and the element at xy in a single evaluate call.
+        
+        The result is reused while the page fingerprint is unchanged, until the next
+        action or screenshot capture; timers and scripts can change the page on their own.
+        
+        Args:
+            xy: Optional (x, y) coordinates of the element to describe
+        """
+        key = tuple(xy) if xy else None
+        fingerprint = self._page_fingerprint()
+        state = self._cached_state(key, fingerprint)
+        if state is None:
+            state = self.page.evaluate(_STATE_SCRIPT, list(xy) if xy else [None, None])
+            self._state_cache[key] = (fingerprint, state)
+        return state
+    
     def get_page_info(self) -> Dict[str, Any]:
         """Get current page information."""
-        if not self.is_initialized:
-            self.initialize()
-            
         try:
+            state = self.get_state_batch()
             return {
-                "url": self.page.url,
-                "title": self.page.title(),
-                "viewport": self.page.viewport_size,
+                "url": state["url"],
+                "title": state["title"],
+                "viewport": state["viewport"],
                 "content_loaded": True
             }
         except Exception as e:
-            print(f"Failed to get page info: {e}")
+            logger.warning("Failed to get page info: %s", e)
             return {"error": str(e)}
     
+    @_requires_browser
     def execute_javascript(self, script: str) -> Any:
         """Execute JavaScript on the page."""
-        if not self.is_initialized:
-            self.initialize()
-            
         try:
             result = self.page.evaluate(script)
             return result
         except Exception as e:
-            print(f"Failed to execute JavaScript: {e}")
+            logger.warning("Failed to execute JavaScript: %s", e)
             return None
     
-    def handle_dialog(self, accept: bool = True, prompt_text: str = ""):
-        """Set up dialog handler for alerts, confirms, prompts."""
-        if not self.is_initialized:
-            self.initialize()
-            
-        def dialog_handler(dialog):
-            if dialog.type == "prompt" and prompt_text:
-                dialog.accept(prompt_text)
-            elif accept:
-                dialog.accept()
-            else:
-                dialog.dismiss()
-                
-        self.page.on("dialog", dialog_handler)
+    def _on_dialog(self, dialog):
+        """Answer alerts, confirms and prompts according to the dialog config."""
+        if dialog.type == "prompt" and self._dialog_cfg["prompt_text"]:
+            dialog.accept(self._dialog_cfg["prompt_text"])
+        elif self._dialog_cfg["accept"]:
+            dialog.accept()
+        else:
+            dialog.dismiss()
     
-    def save_screenshot(self, filepath: str, full_page: bool = False):
-        """Save screenshot to file."""
-        if not self.is_initialized:
-            self.initialize()
-            
+    @_requires_browser
+    def save_screenshot(self, filepath: str, full_page: bool = False, fmt: str = "png"):
+        """
+        Save screenshot to file.
+        
+        Args:
+            filepath: Destination path
+            full_page: Capture the whole page instead of the viewport
+            fmt: 'png', or 'webp' for a file several times smaller
+        """
         try:
-            self.page.screenshot(path=filepath, full_page=full_page)
-            print(f"Screenshot saved to: {filepath}")
+            if fmt == "webp":
+                screenshot_bytes = self.page.screenshot(full_page=full_page, type="png")
+                _save_webp(screenshot_bytes, filepath)
+            else:
+                self.page.screenshot(path=filepath, full_page=full_page)
+            logger.debug("Screenshot saved to: %s", filepath)
         except Exception as e:
-            print(f"Failed to save screenshot: {e}")
+            logger.warning("Failed to save screenshot: %s", e)
     
     def get_element_at_coordinates(self, x: int, y: int) -> Optional[Dict[str, Any]]:
         """Get element information at specific coordinates."""
-        if not self.is_initialized:
-            self.initialize()
+        try:
+            return self.get_state_batch((x, y))["element"]
+        except Exception as e:
+            logger.warning("Failed to get element at (%s, %s): %s", x, y, e)
+            return None
+    
+    @_requires_browser
+    def wait_for_page_load(self, timeout: int = 30000, state: str = "load"):
+        """Wait for page to reach a load state; 'networkidle' is available but can take many seconds."""
+        try:
+            self.page.wait_for_load_state(state, timeout=timeout)
+        except Exception as e:
+            logger.warning("Page load timeout: %s", e)
+    
+    @_requires_browser
+    def accept_cookies(self, timeout: int = 1500):
+        """Try to accept cookies if cookie banner is present within timeout milliseconds."""
+        try:
+            # One auto-waiting click on any known banner button; Playwright waits for
+            # it to be visible and stable, so no check beforehand or sleep afterwards
+            self._cookie_locator.click(timeout=timeout)
+            logger.debug("Accepted cookies")
+            return True
+            
+        except PlaywrightTimeoutError:
+            logger.debug("No cookie banner found or failed to accept")
+            return False
+        except Exception as e:
+            logger.warning("Failed to handle cookies: %s", e)
+            return False
+
+
+class AsyncPlaywrightBrowserController(_PlaywrightControllerBase):
+    """
+    Async Playwright browser controller.
+    Several controllers can share one Browser, each driving its own context,
+    so tasks overlap their network and render waits.
+    """
+    
+    def __init__(self, *args, browser: Optional[Browser] = None, **kwargs):
+        """
+        Initialize the async browser controller.
+        
+        Args:
+            browser: Already launched Browser to open the context in. When omitted,
+                the controller launches and owns its own browser.
+            *args, **kwargs: Same options as PlaywrightBrowserController
+        """
+        super().__init__(*args, **kwargs)
+        self.browser = browser
+        self._owns_browser = browser is None
+    
+    async def launch(self):
+        """Start Playwright and launch the browser if none was provided."""
+        if self.browser is not None:
+            return
+        
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        # A persistent profile launches its browser together with its context
+        if not self.user_data_dir:
+            self.browser = await self._browser_launcher().launch(**self._launch_options())
+    
+    async def _route_request(self, route):
+        """Abort blocked resource requests and let everything else through."""
+        if self._should_block(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def initialize(self):
+        """Initialize the browser context and page (async version)."""
+        if self.is_initialized:
+            return
             
         try:
-            # JavaScript to get element at coordinates
-            script = f"""
-            const element = document.elementFromPoint({x}, {y});
-            if (element) {{
-                return {{
-                    tagName: element.tagName,
-                    className: element.className,
-                    id: element.id,
-                    textContent: element.textContent?.substring(0, 100),
-                    href: element.href,
-                    type: element.type,
-                    value: element.value,
-                    placeholder: element.placeholder
-                }};
-            }}
-            return null;
-            """
+            await self.launch()
             
-            element_info = self.page.evaluate(script)
-            return element_info
+            # Create context
+            if self.user_data_dir:
+                self.context = await self._browser_launcher().launch_persistent_context(
+                    self.user_data_dir, **self._launch_options(), **self._context_options()
+                )
+            else:
+                self.context = await self.browser.new_context(**self._context_options())
+            await self.context.add_init_script(_MUTATION_COUNTER_SCRIPT)
+            if self.block_resources:
+                await self.context.route("**/*", self._route_request)
+            
+            # Create page; a persistent context opens with a blank page already
+            self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+            self.page.set_default_timeout(self.page_load_timeout)
+            self.page.on("dialog", self._on_dialog)
+            self._cookie_locator = _cookie_locator(self.page)
+            self._invalidate_page_cache()
+            
+            self.is_initialized = True
+            logger.info("Playwright browser (%s) context initialized successfully", self.browser_type)
             
         except Exception as e:
-            print(f"Failed to get element at ({x}, {y}): {e}")
+            logger.warning("Failed to initialize browser: %s", e)
+            await self.cleanup()
+            raise
+    
+    async def cleanup(self):
+        """Clean up the context, and the browser too when this controller launched it."""
+        try:
+            if self.page:
+                await self.page.close()
+            if self.context:
+                await self.context.close()
+            if self._owns_browser:
+                if self.browser:
+                    await self.browser.close()
+                if self.playwright:
+                    await self.playwright.stop()
+        except Exception as e:
+            logger.warning("Error during cleanup: %s", e)
+        finally:
+            self.page = None
+            self.context = None
+            if self._owns_browser:
+                self.browser = None
+                self.playwright = None
+            self.is_initialized = False
+    
+    async def _page_fingerprint(self) -> Optional[tuple]:
+        """Fingerprint of what the viewport shows, or None if the page cannot be queried."""
+        try:
+            return tuple(await self.page.evaluate(_FINGERPRINT_SCRIPT))
+        except Exception:
             return None
     
-    def wait_for_page_load(self, timeout: int = 30000):
-        """Wait for page to fully load."""
-        if not self.is_initialized:
-            self.initialize()
-            
+    @_requires_browser
+    async def get_screenshot_bytes(self, fmt: str = "jpeg", quality: int = 70, compress: bool = False) -> bytes:
+        """
+        Get current screenshot as encoded bytes, without decoding it.
+        
+        Args:
+            fmt: Image format, 'jpeg' or 'png'
+            quality: JPEG quality (ignored for PNG)
+            compress: zlib-compress the bytes for storage, e.g. PNG frames kept in a
+                cache; zlib.decompress them before use
+        """
+        fingerprint = await self._page_fingerprint()
+        screenshot_bytes = self._cached_screenshot(fingerprint, fmt, quality)
+        if screenshot_bytes is None:
+            screenshot_bytes = await self.page.screenshot(full_page=False, **_screenshot_options(fmt, quality))
+            self._store_screenshot(fingerprint, fmt, quality, screenshot_bytes)
+        
+        if compress:
+            return zlib.compress(screenshot_bytes, 1)
+        return screenshot_bytes
+    
+    async def get_screenshot(self) -> Image.Image:
+        """Get current screenshot as PIL Image."""
         try:
-            self.page.wait_for_load_state("networkidle", timeout=timeout)
+            return self._image_for(await self.get_screenshot_bytes())
         except Exception as e:
-            print(f"Page load timeout: {e}")
+            logger.warning("Failed to get screenshot: %s", e)
+            # Return a blank image as fallback
+            return self._blank_fallback.copy()
     
-    def accept_cookies(self):
-        """Try to accept cookies if cookie banner is present."""
-        if not self.is_initialized:
-            self.initialize()
+    @_requires_browser
+    async def click(self, x: int, y: int, delay: float = 0):
+        """Click at coordinates (x, y)."""
+        self._invalidate_page_cache()
+        try:
+            # Use mouse click for precise coordinates
+            await self.page.mouse.click(x, y)
+            # The next action waits for whatever it needs; only pace clicks when asked to
+            if delay:
+                await asyncio.sleep(delay)
+            logger.debug("Clicked at coordinates (%s, %s)", x, y)
+        except Exception as e:
+            logger.warning("Failed to click at (%s, %s): %s", x, y, e)
+    
+    @_requires_browser
+    async def type_text(self, text: str, delay: float = 0.05, human: bool = False):
+        """
+        Type text at current cursor position.
+        
+        By default the text is inserted with a single input event, without per-key
+        keydown/keyup events. Pass human=True for fields that react to individual keys.
+        
+        Args:
+            text: Text to type
+            delay: Delay between keystrokes in seconds when typing key by key
+            human: Type key by key instead of inserting the text at once
+        """
+        self._invalidate_page_cache()
+        try:
+            if human:
+                # Type with realistic delay between keystrokes
+                await self.page.keyboard.type(text, delay=int(delay * 1000))
+            else:
+                await self.page.keyboard.insert_text(text)
+            logger.debug("Typed text: '%s'", text)
+        except Exception as e:
+            logger.warning("Failed to type text '%s': %s", text, e)
+    
+    @_requires_browser
+    async def press_key(self, key: str):
+        """Press a specific key."""
+        self._invalidate_page_cache()
+        try:
+            await self.page.keyboard.press(key)
+            logger.debug("Pressed key: %s", key)
+        except Exception as e:
+            logger.warning("Failed to press key '%s': %s", key, e)
+    
+    @_requires_browser
+    async def scroll(self, direction: str, amount: int = 500):
+        """Scroll in given direction."""
+        self._invalidate_page_cache()
+        try:
+            if direction.lower() not in _SCROLL_DIRECTIONS:
+                logger.warning("Unknown scroll direction: %s", direction)
+                return
             
+            x, y = _SCROLL_DIRECTIONS[direction.lower()]
+            dx, dy = x * amount, y * amount
+            if self.use_wheel_events:
+                await self.page.mouse.wheel(dx, dy)
+                # Wait for the scrolled frame to be painted
+                await self.page.evaluate(_FRAME_FENCE_SCRIPT)
+            else:
+                # Scroll and wait for the painted frame in one round-trip
+                await self.page.evaluate(_SCROLL_SCRIPT, [dx, dy])
+            logger.debug("Scrolled %s by %s pixels", direction, amount)
+            
+        except Exception as e:
+            logger.warning("Failed to scroll %s: %s", direction, e)
+    
+    async def _wait_for_target(self, selector: Optional[str]):
+        """Wait for the element the caller needs after a navigation, if one was given."""
+        if selector:
+            await self.page.wait_for_selector(selector, state="visible")
+    
+    @_requires_browser
+    async def go_back(self, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
+        """Navigate back in browser history."""
+        self._invalidate_page_cache()
         try:
-            # Common cookie acceptance selectors
-            cookie_selectors = [
-                'button:has-text("Accept")',
-                'button:has-text("Accept All")',
-                'button:has-text("Allow All")',
-                'button:has-text("I Accept")',
-                'button:has-text("OK")',
-                '[id*="accept"]',
-                '[class*="accept"]',
-                '[data-testid*="accept"]'
-            ]
+            await self.page.go_back(wait_until=wait_until)
+            await self._wait_for_target(wait_for)
+            self.current_url = self.page.url
+            logger.debug("Navigated back")
+        except Exception as e:
+            logger.warning("Failed to go back: %s", e)
+    
+    @_requires_browser
+    async def go_forward(self, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
+        """Navigate forward in browser history."""
+        self._invalidate_page_cache()
+        try:
+            await self.page.go_forward(wait_until=wait_until)
+            await self._wait_for_target(wait_for)
+            self.current_url = self.page.url
+            logger.debug("Navigated forward")
+        except Exception as e:
+            logger.warning("Failed to go forward: %s", e)
+    
+    @_requires_browser
+    async def refresh(self, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
+        """Refresh current page."""
+        self._invalidate_page_cache()
+        try:
+            await self.page.reload(wait_until=wait_until)
+            await self._wait_for_target(wait_for)
+            logger.debug("Page refreshed")
+        except Exception as e:
+            logger.warning("Failed to refresh page: %s", e)
+    
+    @_requires_browser
+    async def goto(self, url: str, wait_until: str = "domcontentloaded", wait_for: Optional[str] = None):
+        """Navigate to URL."""
+        self._invalidate_page_cache()
+        try:
+            # Ensure URL has protocol
+            if not url.startswith(("http://", "https://")):
+                url = "https://" + url
+                
+            await self.page.goto(url, wait_until=wait_until)
+            await self._wait_for_target(wait_for)
+            self.current_url = self.page.url
+            logger.debug("Navigated to: %s", url)
             
-            for selector in cookie_selectors:
-                try:
-                    if self.page.is_visible(selector, timeout=1000):
-                        self.page.click(selector)
-                        print("Accepted cookies")
-                        time.sleep(1)
-                        return True
-                except:
-                    continue
-                    
-            print("No cookie banner found or failed to accept")
+        except Exception as e:
+            logger.warning("Failed to navigate to %s: %s", url, e)
+    
+    async def restart(self):
+        """Restart/reset browser state with a fresh context, keeping the browser."""
+        logger.info("Restarting browser...")
+        try:
+            if self.context:
+                await self.context.close()
+        except Exception as e:
+            logger.warning("Error closing context: %s", e)
+        finally:
+            self.page = None
+            self.context = None
+            self.is_initialized = False
+        await self.initialize()
+    
+    @_requires_browser
+    async def wait_for_element(self, selector: str, timeout: int = 5000) -> bool:
+        """Wait for element to appear."""
+        try:
+            await self.page.wait_for_selector(selector, timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning("Element '%s' not found within %sms: %s", selector, timeout, e)
             return False
+    
+    @_requires_browser
+    async def get_state_batch(self, xy: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Get url, title, viewport and the element at xy in a single evaluate call.
+        
+        The result is reused while the page fingerprint is unchanged, until the next
+        action or screenshot capture; timers and scripts can change the page on their own.
+        
+        Args:
+            xy: Optional (x, y) coordinates of the element to describe
+        """
+        key = tuple(xy) if xy else None
+        fingerprint = await self._page_fingerprint()
+        state = self._cached_state(key, fingerprint)
+        if state is None:
+            state = await self.page.evaluate(_STATE_SCRIPT, list(xy) if xy else [None, None])
+            self._state_cache[key] = (fingerprint, state)
+        return state
+    
+    async def get_page_info(self) -> Dict[str, Any]:
+        """Get current page information."""
+        try:
+            state = await self.get_state_batch()
+            return {
+                "url": state["url"],
+                "title": state["title"],
+                "viewport": state["viewport"],
+                "content_loaded": True
+            }
+        except Exception as e:
+            logger.warning("Failed to get page info: %s", e)
+            return {"error": str(e)}
+    
+    @_requires_browser
+    async def execute_javascript(self, script: str) -> Any:
+        """Execute JavaScript on the page."""
+        try:
+            result = await self.page.evaluate(script)
+            return result
+        except Exception as e:
+            logger.warning("Failed to execute JavaScript: %s", e)
+            return None
+    
+    async def _on_dialog(self, dialog):
+        """Answer alerts, confirms and prompts according to the dialog config."""
+        if dialog.type == "prompt" and self._dialog_cfg["prompt_text"]:
+            await dialog.accept(self._dialog_cfg["prompt_text"])
+        elif self._dialog_cfg["accept"]:
+            await dialog.accept()
+        else:
+            await dialog.dismiss()
+    
+    @_requires_browser
+    async def save_screenshot(self, filepath: str, full_page: bool = False, fmt: str = "png"):
+        """
+        Save screenshot to file.
+        
+        Args:
+            filepath: Destination path
+            full_page: Capture the whole page instead of the viewport
+            fmt: 'png', or 'webp' for a file several times smaller
+        """
+        try:
+            if fmt == "webp":
+                screenshot_bytes = await self.page.screenshot(full_page=full_page, type="png")
+                await asyncio.to_thread(_save_webp, screenshot_bytes, filepath)
+            else:
+                await self.page.screenshot(path=filepath, full_page=full_page)
+            logger.debug("Screenshot saved to: %s", filepath)
+        except Exception as e:
+            logger.warning("Failed to save screenshot: %s", e)
+    
+    async def get_element_at_coordinates(self, x: int, y: int) -> Optional[Dict[str, Any]]:
+        """Get element information at specific coordinates."""
+        try:
+            return (await self.get_state_batch((x, y)))["element"]
+        except Exception as e:
+            logger.warning("Failed to get element at (%s, %s): %s", x, y, e)
+            return None
+    
+    @_requires_browser
+    async def wait_for_page_load(self, timeout: int = 30000, state: str = "load"):
+        """Wait for page to reach a load state; 'networkidle' is available but can take many seconds."""
+        try:
+            await self.page.wait_for_load_state(state, timeout=timeout)
+        except Exception as e:
+            logger.warning("Page load timeout: %s", e)
+    
+    @_requires_browser
+    async def accept_cookies(self, timeout: int = 1500):
+        """Try to accept cookies if cookie banner is present within timeout milliseconds."""
+        try:
+            # One auto-waiting click on any known banner button; Playwright waits for
+            # it to be visible and stable, so no check beforehand or sleep afterwards
+            await self._cookie_locator.click(timeout=timeout)
+            logger.debug("Accepted cookies")
+            return True
             
+        except PlaywrightTimeoutError:
+            logger.debug("No cookie banner found or failed to accept")
+            return False
         except Exception as e:
-            print(f"Failed to handle cookies: {e}")
+            logger.warning("Failed to handle cookies: %s", e)
             return False
 
 
@@ -405,7 +1127,8 @@ class PlaywrightWebAgent:
                  agent,  # WebBrowsingAgent instance
                  headless: bool = False,
                  browser_type: str = "chromium",
-                 viewport_size: Dict[str, int] = None):
+                 viewport_size: Dict[str, int] = None,
+                 block_resources: bool = False):
         """
         Initialize the Playwright-based web agent.
         
@@ -414,13 +1137,24 @@ class PlaywrightWebAgent:
             headless: Whether to run browser in headless mode
             browser_type: Browser type ('chromium', 'firefox', 'webkit')
             viewport_size: Viewport dimensions
+            block_resources: Abort image, media and font requests
         """
         self.agent = agent
-        self.browser_controller = PlaywrightBrowserController(
-            headless=headless,
-            browser_type=browser_type,
-            viewport_size=viewport_size
-        )
+        self.controller_options = {
+            "headless": headless,
+            "browser_type": browser_type,
+            "viewport_size": viewport_size,
+            "block_resources": block_resources,
+        }
+        # Created on first use, so run_tasks_async works inside a running event loop
+        self._browser_controller = None
+    
+    @property
+    def browser_controller(self) -> PlaywrightBrowserController:
+        """Sync controller for run_task and interactive_session."""
+        if self._browser_controller is None:
+            self._browser_controller = PlaywrightBrowserController(**self.controller_options)
+        return self._browser_controller
         
     def run_task(self, task: str, starting_url: str = None, max_steps: int = 30) -> Dict[str, Any]:
         """
@@ -458,8 +1192,102 @@ class PlaywrightWebAgent:
                 "error_type": type(e).__name__
             }
         finally:
-            # Clean up
-            self.browser_controller.cleanup()
+            # Recycle the context; the browser stays pooled for the next task
+            if self._browser_controller is not None:
+                self._browser_controller.cleanup()
+    
+    async def run_tasks_async(self, 
+                              tasks: List[Dict[str, Any]], 
+                              max_concurrency: int = 4,
+                              max_steps: int = 30,
+                              batch_queue: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Run several browsing tasks concurrently on one browser.
+        
+        Each task gets its own browser context and a copy of the agent that shares
+        the loaded model. Tasks run through the agent's run_task_async, so one task's
+        page loads and renders overlap another's inference.
+        
+        Args:
+            tasks: Task dicts with a "task" description and an optional "url"
+            max_concurrency: Maximum number of tasks running at once
+            max_steps: Maximum number of steps per task
+            batch_queue: web_agent.BatchQueue over the agent, to batch the tasks'
+                navigation calls into shared generate() calls (optional)
+            
+        Returns:
+            Task execution results, in the order of tasks
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # One browser process for every task; contexts are cheap and isolated
+        root = AsyncPlaywrightBrowserController(**self.controller_options)
+        await root.launch()
+        
+        async def run_one(spec: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                controller = AsyncPlaywrightBrowserController(browser=root.browser, **self.controller_options)
+                # The agent keeps per-task state, so each task drives its own shallow copy
+                agent = copy.copy(self.agent)
+                try:
+                    await controller.initialize()
+                    
+                    if spec.get("url"):
+                        await controller.goto(spec["url"])
+                        await controller.wait_for_page_load()
+                        await controller.accept_cookies()
+                    
+                    return await agent.run_task_async(spec["task"], controller, max_steps, batch_queue)
+                    
+                except Exception as e:
+                    return {
+                        "status": "error",
+                        "message": f"Task execution failed: {str(e)}",
+                        "error_type": type(e).__name__
+                    }
+                finally:
+                    await controller.cleanup()
+        
+        try:
+            return await asyncio.gather(*[run_one(spec) for spec in tasks])
+        finally:
+            await root.cleanup()
+    
+    def run_tasks(self, 
+                  tasks: List[Dict[str, Any]], 
+                  agent_factory: Callable[[], Any],
+                  max_workers: int = 1,
+                  max_steps: int = 30) -> List[Dict[str, Any]]:
+        """
+        Run a sweep of independent tasks across worker processes.
+        
+        Each worker builds its own agent and keeps one pooled browser for all the
+        tasks it runs, creating a fresh context per task. Workers are spawned, so
+        agent_factory must be importable and the caller needs a __main__ guard.
+        
+        Every worker process loads its own full copy of the model, so memory (GPU
+        memory on CUDA) grows linearly with max_workers; raise it only when there
+        is room for that many models.
+        
+        Args:
+            tasks: Task dicts with a "task" description and an optional "url"
+            agent_factory: Picklable callable returning a WebBrowsingAgent, e.g. the class
+            max_workers: Number of worker processes, each holding a full model (default 1)
+            max_steps: Maximum number of steps per task
+            
+        Returns:
+            Task execution results, in the order of tasks
+        """
+        if not tasks:
+            return []
+        
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(tasks)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(agent_factory, self.controller_options),
+        ) as executor:
+            return list(executor.map(_run_worker_task, tasks, [max_steps] * len(tasks)))
     
     def interactive_session(self, starting_url: str = None):
         """
@@ -520,7 +1348,23 @@ class PlaywrightWebAgent:
                     print(f"Error: {e}")
                     
         finally:
-            self.browser_controller.cleanup()
+            if self._browser_controller is not None:
+                self._browser_controller.cleanup()
+
+
+# Agent owned by each run_tasks worker process
+_WORKER_AGENT = None
+
+
+def _init_worker(agent_factory: Callable[[], Any], controller_options: Dict[str, Any]):
+    """Build the worker's agent once; its browser is pooled across the tasks it runs."""
+    global _WORKER_AGENT
+    _WORKER_AGENT = PlaywrightWebAgent(agent_factory(), **controller_options)
+
+
+def _run_worker_task(spec: Dict[str, Any], max_steps: int) -> Dict[str, Any]:
+    """Run one task on the worker's agent."""
+    return _WORKER_AGENT.run_task(spec["task"], spec.get("url"), max_steps)
 
 
 # Example usage and test script
@@ -567,6 +1411,12 @@ def main():
     # )
     # print(f"Result: {result}")
     
+    # Or spread them over worker processes, each loading its own model:
+    # results = playwright_agent.run_tasks(example_tasks, WebBrowsingAgent, max_workers=2)
+    
+    # Or run all examples concurrently, one browser context each:
+    # results = asyncio.run(playwright_agent.run_tasks_async(example_tasks, max_concurrency=3))
+    
     # Or start interactive session:
     # playwright_agent.interactive_session("https://google.com")
 
@@ -0,0 +1,65 @@
+"""Weight formats the Holo1 agents load the model in, shared by holo.py, web_agent.py and debug.py.
+
+int8 and nf4 quantize with bitsandbytes at load time (pinned in requirements.txt).
+int4-awq loads an already AWQ-quantized checkpoint and needs AutoAWQ, an optional
+extra left out of requirements.txt: pip install autoawq
+"""
+
+from typing import Any, Dict, Literal, Union
+
+import torch
+from transformers import BitsAndBytesConfig
+
+Quantization = Literal["bf16", "int8", "nf4", "int4-awq"]
+
+# bitsandbytes settings per weight format; the vision tower ("visual") and the output
+# head stay in bf16 since quantizing them costs localization accuracy
+BNB_CONFIGS = {
+    "int8": {
+        "load_in_8bit": True,
+        "llm_int8_skip_modules": ["visual", "lm_head"],
+    },
+    "nf4": {
+        "load_in_4bit": True,
+        "bnb_4bit_quant_type": "nf4",
+        "bnb_4bit_compute_dtype": torch.bfloat16,
+        "bnb_4bit_use_double_quant": True,
+        "llm_int8_skip_modules": ["visual", "lm_head"],
+    },
+}
+
+QUANTIZATIONS = ("bf16", *BNB_CONFIGS, "int4-awq")
+
+
+def load_kwargs(quantization: str, torch_dtype: Union[str, torch.dtype]) -> Dict[str, Any]:
+    """from_pretrained keyword arguments for a weight format; torch_dtype is used for bf16."""
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unsupported quantization: {quantization}")
+    if quantization == "int4-awq":
+        # AWQ checkpoints carry their own quantization_config; the kernels run in fp16
+        return {"torch_dtype": torch.float16}
+    if quantization in BNB_CONFIGS:
+        return {
+            "torch_dtype": torch.bfloat16,
+            "quantization_config": BitsAndBytesConfig(**BNB_CONFIGS[quantization]),
+        }
+    return {"torch_dtype": torch_dtype}
+
+
+def check_loaded(model, quantization: str, model_name: str):
+    """Raise ValueError if an int4-awq model did not come from an AWQ checkpoint.
+
+    A plain checkpoint loads fine in fp16, silently giving up the int4 weights.
+    """
+    if quantization != "int4-awq":
+        return
+    quant_config = getattr(model.config, "quantization_config", None)
+    if isinstance(quant_config, dict):
+        quant_method = quant_config.get("quant_method")
+    else:
+        quant_method = getattr(quant_config, "quant_method", None)
+    if quant_method != "awq":
+        raise ValueError(
+            f"int4-awq needs an AWQ-quantized checkpoint, but {model_name} "
+            f"has quantization method {quant_method!r}"
+        )
@@ -0,0 +1,35 @@
+import logging
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("xxhash")
+pytest.importorskip("lmformatenforcer")
+
+import debug
+import web_agent
+
+
+def make_agent():
+    # Parsing needs no model; skip loading one
+    agent = debug.DebugWebBrowsingAgent.__new__(debug.DebugWebBrowsingAgent)
+    agent.current_step = 1
+    agent.memory = []
+    agent.task_notes = ""
+    return agent
+
+
+def test_debug_agent_is_the_web_agent():
+    assert issubclass(debug.DebugWebBrowsingAgent, web_agent.WebBrowsingAgent)
+    # The debug hooks wrap the real agent's methods rather than replacing them
+    assert debug.DebugWebBrowsingAgent.navigate is debug.DebugMixin.navigate
+
+
+def test_debug_hooks_log_and_delegate(caplog, monkeypatch):
+    monkeypatch.setattr(debug.logger, "level", logging.DEBUG)
+    response = '{"note": "", "thought": "look", "action": {"action": "wait", "seconds": 3}}'
+    with caplog.at_level(logging.DEBUG, logger=debug.logger.name):
+        step = make_agent()._parse_navigation(response)
+    assert step.thought == "look"
+    assert "   Thought: look" in caplog.messages
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("selenium")
+pytest.importorskip("xxhash")
+
+import holo
+
+
+def step(note=""):
+    return holo.NavigationStep(note=note, thought="look", action={"action": "wait", "seconds": 2})
+
+
+def test_record_step_formats_history():
+    memory = holo.AgentMemory(task="find shoes")
+    memory.step_count = 2
+    memory.record_step(step())
+    assert memory.history[-1] == "Step 2:\nThought: look\nAction: wait\n---"
+    memory.record_step(step(note="price is 5"))
+    assert "Notes: price is 5" in memory.history[-1]
+
+
+def test_record_step_keeps_the_history_window():
+    memory = holo.AgentMemory(task="find shoes")
+    for count in range(holo.HISTORY_WINDOW + 2):
+        memory.step_count = count
+        memory.record_step(step())
+    assert len(memory.history) == holo.HISTORY_WINDOW
+    assert memory.history[0].startswith("Step 2:")
+
+
+@pytest.mark.parametrize("response, coords", [
+    ('{"action": "click", "x": 12, "y": 34}', ("12", "34")),
+    ('{"x":12,"y" : 34', ("12", "34")),
+    ('Sure: "x": 5, "y": 6}', ("5", "6")),
+])
+def test_coord_re_recovers_coordinates(response, coords):
+    assert holo._COORD_RE.search(response).groups() == coords
+
+
+@pytest.mark.parametrize("response", ['{"x": "12", "y": "34"}', '{"y": 34, "x": 12}', "Click(12, 34)"])
+def test_coord_re_needs_numeric_x_then_y(response):
+    assert holo._COORD_RE.search(response) is None
+
+
+class TemplateProcessor:
+    """Renders conversations the way a chat template does; static unless told otherwise."""
+
+    def __init__(self, static=True):
+        self.static = static
+        self.renders = 0
+        self.tokenizer = lambda text, **kwargs: SimpleNamespace(input_ids=text)
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=False):
+        self.renders += 1
+        text = "" if self.static else f"<|render {self.renders}|>"
+        for message in messages:
+            text += f"<|{message['role']}|>"
+            for part in message["content"]:
+                text += part["text"] if part["type"] == "text" else "<|image|>"
+            text += "<|end|>\n"
+        if add_generation_prompt:
+            text += "<|assistant|>"
+        return text
+
+
+def test_user_turn_splice_matches_a_full_render():
+    navigator = holo.Holo1Navigator(SimpleNamespace(processor=TemplateProcessor()))
+    sample = ("find shoes", 3, "Step 2:\nThought: look")
+    spliced = navigator._join_user_segments(navigator._user_segments, *sample)
+    assert spliced == navigator._render_user_text(*sample)
+    assert "<observation step=3>" in spliced
+    # Together with the cached system turn it is the whole prompt
+    processor = navigator.model.processor
+    full = processor.apply_chat_template(
+        navigator._system_messages() + navigator._user_messages(*sample, None), add_generation_prompt=True
+    )
+    assert navigator._system_text + spliced == full
+
+
+def test_user_turn_is_rendered_per_step_when_the_template_is_not_static():
+    navigator = holo.Holo1Navigator(SimpleNamespace(processor=TemplateProcessor(static=False)))
+    assert navigator._user_segments is None
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+
+import playwright_controller
+from playwright_controller import PlaywrightBrowserController
+
+
+class FakeMouse:
+    def click(self, x, y):
+        pass
+
+
+class FakeKeyboard:
+    def insert_text(self, text):
+        pass
+
+
+class FakePage:
+    """Answers the fingerprint script with a settable value and counts captures."""
+
+    def __init__(self):
+        self.fingerprint = ["https://example.com/", 0, 0, 3, 7]
+        self.captures = 0
+        self.url = "https://example.com/"
+        self.mouse = FakeMouse()
+        self.keyboard = FakeKeyboard()
+
+    def evaluate(self, script, arg=None):
+        if script == playwright_controller._FINGERPRINT_SCRIPT:
+            return list(self.fingerprint)
+        return None
+
+    def screenshot(self, **kwargs):
+        self.captures += 1
+        return b"frame %d" % self.captures
+
+    def goto(self, url, wait_until=None):
+        self.url = url
+
+
+def make_controller():
+    # No browser is launched; the page is faked
+    controller = PlaywrightBrowserController(headless=True)
+    controller.page = FakePage()
+    controller.is_initialized = True
+    return controller
+
+
+def test_unchanged_page_reuses_capture():
+    controller = make_controller()
+    first = controller.get_screenshot_bytes()
+    assert controller.get_screenshot_bytes() is first
+    assert controller.page.captures == 1
+
+
+def test_finished_resource_load_invalidates_capture():
+    controller = make_controller()
+    controller.get_screenshot_bytes()
+    controller.page.fingerprint[3] += 1
+    controller.get_screenshot_bytes()
+    assert controller.page.captures == 2
+
+
+def test_page_without_counter_is_never_cached():
+    controller = make_controller()
+    controller.page.fingerprint[-1] = None
+    controller.get_screenshot_bytes()
+    controller.get_screenshot_bytes()
+    assert controller.page.captures == 2
+
+
+@pytest.mark.parametrize("action, args", [
+    ("click", (10, 20)),
+    ("type_text", ("hello",)),
+    ("scroll", ("down",)),
+    ("goto", ("https://example.com/next",)),
+])
+def test_actions_invalidate_capture(action, args):
+    controller = make_controller()
+    controller.get_screenshot_bytes()
+    # The fingerprint is left unchanged: the action alone must force a new capture
+    getattr(controller, action)(*args)
+    controller.get_screenshot_bytes()
+    assert controller.page.captures == 2
+
+
+
+def test_sync_controller_refuses_a_running_loop():
+    async def construct():
+        PlaywrightBrowserController(headless=True)
+
+    with pytest.raises(RuntimeError, match="AsyncPlaywrightBrowserController"):
+        asyncio.run(construct())
+
+
+def test_gpu_is_disabled_only_headless():
+    assert "--disable-gpu" in make_controller()._launch_options()["args"]
+    headed = PlaywrightBrowserController(headless=False)
+    assert "--disable-gpu" not in headed._launch_options()["args"]
+
+
+def test_site_isolation_stays_on():
+    args = " ".join(make_controller()._launch_options()["args"])
+    assert "site-per-process" not in args
+    assert "IsolateOrigins" not in args
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = SimpleNamespace(launch=lambda **kwargs: FakeBrowser())
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+
+def pooled_browser():
+    controller = PlaywrightBrowserController(headless=True)
+    controller._ensure_browser()
+    return controller.browser
+
+
+def test_browser_pool_is_per_thread(monkeypatch):
+    monkeypatch.setattr(playwright_controller, "sync_playwright", FakePlaywright)
+    try:
+        main_browser = pooled_browser()
+        assert pooled_browser() is main_browser
+
+        other = {}
+        def worker():
+            other["browser"] = pooled_browser()
+            playwright_controller.close_browser_pool()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        assert other["browser"] is not main_browser
+        assert other["browser"].closed
+        assert not main_browser.closed
+    finally:
+        playwright_controller.close_browser_pool()
+    assert main_browser.closed
+
+
+@pytest.mark.parametrize("name", ["Accept all", "Allow all cookies", "I agree", "OK"])
+def test_cookie_button_name_matches_consent(name):
+    assert playwright_controller._COOKIE_BUTTON_NAME.search(name)
+
+
+@pytest.mark.parametrize("name", ["Don't allow", "Don’t accept", "Do not allow", "Reject all", "Cookie settings"])
+def test_cookie_button_name_skips_refusals(name):
+    assert not playwright_controller._COOKIE_BUTTON_NAME.search(name)
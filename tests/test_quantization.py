@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import quantization as quant
+
+
+def model_with(quantization_config):
+    return SimpleNamespace(config=SimpleNamespace(quantization_config=quantization_config))
+
+
+def test_bf16_uses_the_given_dtype():
+    assert quant.load_kwargs("bf16", torch.float16) == {"torch_dtype": torch.float16}
+
+
+def test_awq_loads_in_fp16_without_a_config():
+    assert quant.load_kwargs("int4-awq", torch.bfloat16) == {"torch_dtype": torch.float16}
+
+
+def test_unknown_name_is_rejected():
+    with pytest.raises(ValueError):
+        quant.load_kwargs("awq", torch.bfloat16)
+
+
+def test_awq_checkpoint_passes():
+    quant.check_loaded(model_with({"quant_method": "awq"}), "int4-awq", "repo")
+
+
+@pytest.mark.parametrize("config", [None, {"quant_method": "gptq"}])
+def test_non_awq_checkpoint_is_rejected(config):
+    with pytest.raises(ValueError, match="AWQ"):
+        quant.check_loaded(model_with(config), "int4-awq", "repo")
+
+
+def test_other_formats_are_not_checked():
+    quant.check_loaded(model_with(None), "bf16", "repo")
@@ -0,0 +1,246 @@
+import asyncio
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("xxhash")
+pytest.importorskip("lmformatenforcer")
+
+from PIL import Image
+
+import web_agent
+
+
+def make_agent():
+    # Parsing needs no model; skip loading one
+    agent = web_agent.WebBrowsingAgent.__new__(web_agent.WebBrowsingAgent)
+    agent.current_step = 1
+    agent.memory = []
+    agent.task_notes = ""
+    agent._last_scale = 1.0
+    agent._consecutive_waits = 0
+    agent._wait_screenshot = None
+    return agent
+
+
+def test_parse_navigation_unterminated_fence():
+    # Generation stops at the closing brace, so the closing fence never arrives
+    response = '```json\n{"note": "", "thought": "look", "action": {"action": "wait", "seconds": 3}}'
+    step = make_agent()._parse_navigation(response)
+    assert step.thought == "look"
+    assert step.action.seconds == 3
+
+
+def test_parse_navigation_closed_fence():
+    response = '```json\n{"thought": "look", "action": {"action": "wait", "seconds": 3}}\n```'
+    assert make_agent()._parse_navigation(response).thought == "look"
+
+
+def test_parse_navigation_records_notes():
+    agent = make_agent()
+    agent.current_step = 4
+    response = '{"note": "price is 5", "thought": "look", "action": {"action": "wait", "seconds": 3}}'
+    agent._parse_navigation(response)
+    assert agent.task_notes == "\nStep 4: price is 5"
+
+
+@pytest.mark.parametrize("response", ["", '{"thought": "look"', '{"thought": "look"}'])
+def test_parse_navigation_falls_back_to_wait(response):
+    step = make_agent()._parse_navigation(response)
+    assert step.action.action == "wait"
+
+
+def test_fence_regex():
+    assert web_agent._FENCE.match('```json\n{"a": 1}').group(1) == '{"a": 1}'
+    assert web_agent._FENCE.match('```\n{"a": 1}\n```\ntrailing').group(1) == '{"a": 1}'
+    assert web_agent._FENCE.match('{"a": 1}') is None
+
+
+class RecordingAgent:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def run_inference_batch(self, requests, max_tokens, schema=None):
+        self.calls.append((list(requests), max_tokens, schema))
+        time.sleep(self.delay)
+        return [f"reply to {request}" for request in requests]
+
+
+def test_batch_queue_batches_concurrent_requests():
+    agent = RecordingAgent()
+
+    async def run():
+        queue = web_agent.BatchQueue(agent, window=0.05)
+        replies = await asyncio.gather(
+            queue.submit("a", max_tokens=1024, schema="navigation"),
+            queue.submit("b", max_tokens=1024, schema="navigation"),
+            queue.submit("c", max_tokens=256, schema="localization"),
+        )
+        await queue.close()
+        return replies
+
+    assert asyncio.run(run()) == ["reply to a", "reply to b", "reply to c"]
+    # One generate() per max_tokens and schema
+    assert sorted(agent.calls) == [(["a", "b"], 1024, "navigation"), (["c"], 256, "localization")]
+
+
+def test_batch_queue_close_cancels_taken_requests():
+    async def run():
+        queue = web_agent.BatchQueue(RecordingAgent(delay=0.2), window=0.0)
+        pending = asyncio.ensure_future(queue.submit("prompt"))
+        # Let the flush loop take the request and start generating
+        await asyncio.sleep(0.05)
+        await queue.close()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+    
+    asyncio.run(run())
+
+
+class PieceTokenizer:
+    """Decodes token i to pieces[i]."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def batch_decode(self, ids):
+        return ["".join(self.pieces[i] for i in row) for row in ids.tolist()]
+
+
+def stop_steps(*replies):
+    """Feed each row its reply one piece per step; the step each row was stopped at."""
+    pieces = sorted({piece for reply in replies for piece in reply})
+    criteria = web_agent.JsonDoneCriteria(PieceTokenizer(pieces), len(replies))
+    stopped = [None] * len(replies)
+    for step in range(max(map(len, replies))):
+        ids = torch.tensor([[pieces.index(reply[min(step, len(reply) - 1)])] for reply in replies])
+        for row, done in enumerate(criteria(ids, None).tolist()):
+            if done and stopped[row] is None:
+                stopped[row] = step
+    return stopped
+
+
+def test_json_done_stops_at_the_closing_brace():
+    assert stop_steps(['{"a": ', '{"b": 1}', '}', ' trailing']) == [2]
+
+
+def test_json_done_ignores_braces_in_strings():
+    assert stop_steps(['{"t": "', 'a } b', '"', '}']) == [3]
+    assert stop_steps(['{"t": "', 'say \\"}', '"}']) == [2]
+
+
+def test_json_done_ignores_a_brace_before_the_object():
+    assert stop_steps(['Sure', ' }', '{', '}']) == [3]
+
+
+def test_json_done_tracks_rows_separately():
+    assert stop_steps(['{', '}'], ['{', '{', '}', '}']) == [1, 3]
+
+
+def test_to_page_coords():
+    agent = make_agent()
+    assert agent._to_page_coords(100, 40) == (100, 40)
+    agent._last_scale = 0.8
+    assert agent._to_page_coords(100, 40) == (125, 50)
+
+
+def wait_step():
+    return web_agent.NavigationStep(note="", thought="wait", action={"action": "wait", "seconds": 2})
+
+
+def click_step():
+    return web_agent.NavigationStep(
+        note="", thought="click", action={"action": "click_element", "element": "button", "x": 1, "y": 2}
+    )
+
+
+def test_wait_on_an_unchanged_screenshot_backs_off_once():
+    agent = make_agent()
+    screenshot = Image.new("RGB", (8, 8))
+    agent._track_waits(wait_step(), screenshot)
+    # Same pixels, new image object: still the same page
+    assert agent._wait_backoff(screenshot.copy()) == 2
+    assert agent._wait_backoff(screenshot) is None
+
+
+def test_wait_backoff_grows_and_is_capped():
+    agent = make_agent()
+    screenshot = Image.new("RGB", (8, 8))
+    agent._track_waits(wait_step(), screenshot)
+    agent._track_waits(wait_step(), screenshot)
+    assert agent._wait_backoff(screenshot) == 4
+    for _ in range(5):
+        agent._track_waits(wait_step(), screenshot)
+    assert agent._wait_backoff(screenshot) == 30
+
+
+def test_wait_backoff_needs_the_same_screenshot_and_a_wait():
+    agent = make_agent()
+    agent._track_waits(wait_step(), Image.new("RGB", (8, 8)))
+    assert agent._wait_backoff(Image.new("RGB", (8, 8), color="white")) is None
+    
+    agent._track_waits(wait_step(), Image.new("RGB", (8, 8)))
+    agent._track_waits(click_step(), Image.new("RGB", (8, 8)))
+    assert agent._consecutive_waits == 0
+    assert agent._wait_backoff(Image.new("RGB", (8, 8))) is None
+
+
+def test_backoff_result_advances_the_step():
+    agent = make_agent()
+    agent.current_step = 3
+    result = agent._backoff_result(4)
+    assert agent.current_step == 4
+    assert result["status"] == "continuing"
+    assert result["step"] == 3
+    assert result["action"] == {"action": "wait", "seconds": 4}
+
+
+class TemplateProcessor:
+    """Renders conversations the way a chat template does; static unless told otherwise."""
+
+    def __init__(self, static=True):
+        self.static = static
+        self.renders = 0
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=False):
+        self.renders += 1
+        text = "" if self.static else f"<|render {self.renders}|>"
+        for message in messages:
+            text += f"<|{message['role']}|>"
+            for part in message["content"]:
+                text += part["text"] if part["type"] == "text" else "<|image|>"
+            text += "<|end|>\n"
+        if add_generation_prompt:
+            text += "<|assistant|>"
+        return text
+
+
+def make_prompt_agent(processor):
+    agent = make_agent()
+    agent.processor = processor
+    agent._navigation_template = None
+    return agent
+
+
+def test_navigation_text_splice_matches_a_full_render():
+    processor = TemplateProcessor()
+    agent = make_prompt_agent(processor)
+    context = "<memory>\nStep 1: look\n</memory>\n"
+    text = agent._navigation_text("find shoes", 3, context)
+    assert text == agent._render_navigation_prompt("find shoes", 3, context)
+    assert "find shoes" in text and "<observation step=3>" in text
+    # Later steps are spliced without rendering
+    renders = processor.renders
+    agent._navigation_text("find shoes", 4, "")
+    assert processor.renders == renders
+
+
+def test_navigation_text_renders_per_step_when_the_template_is_not_static():
+    processor = TemplateProcessor(static=False)
+    agent = make_prompt_agent(processor)
+    text = agent._navigation_text("find shoes", 3, "")
+    assert agent._navigation_template == ()
+    assert text.startswith(f"<|render {processor.renders}|>")
@@ -1,17 +1,159 @@
-import json
+import asyncio
+import atexit
+import functools
+import gc
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
 import time
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 from PIL import Image
 import io
 import base64
-from transformers import AutoModelForImageTextToText, AutoProcessor
+from transformers import (
+    AutoModelForImageTextToText,
+    AutoProcessor,
+    BatchFeature,
+    StoppingCriteria,
+    StoppingCriteriaList,
+)
+from transformers.utils import is_flash_attn_2_available
+from lmformatenforcer import JsonSchemaParser
+from lmformatenforcer.integrations.transformers import (
+    build_token_enforcer_tokenizer_data,
+    build_transformers_prefix_allowed_tokens_fn,
+)
 import torch
-from pydantic import BaseModel, Field
+import xxhash
+from torchvision.io import ImageReadMode, decode_jpeg
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from pydantic_core import from_json
 from typing import Literal
 
 # Import your existing modules
 from navigation import get_navigation_prompt, NavigationStep, ActionSpace
 from localization import get_localization_prompt_structured_output, ClickAction
+import quantization as quant
+
+# Markdown code fence the model may wrap its JSON in; the closing fence is optional
+# because generation stops at the JSON's closing brace, before the fence is emitted
+_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*(?:```|\Z)", re.S)
+
+# Validates a NavigationStep straight from the model's JSON text
+_NAV_ADAPTER = TypeAdapter(NavigationStep)
+
+logger = logging.getLogger("web_agent")
+_log_listener = None
+
+
+def configure_cuda_allocator():
+    """
+    Set PYTORCH_CUDA_ALLOC_CONF to CUDA_ALLOC_CONF unless the environment already sets it.
+    
+    The allocator reads it when CUDA initializes, so call this from the entry point
+    before anything touches the GPU, e.g. before creating the agent.
+    """
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", CUDA_ALLOC_CONF)
+    if torch.cuda.is_initialized():
+        logger.warning("CUDA is already initialized; PYTORCH_CUDA_ALLOC_CONF has no effect")
+
+
+def configure_logging(level: int = logging.INFO):
+    """
+    Print the agent's log records to stdout, for scripts running the agent directly.
+    
+    Records are queued by the agent and written out by a background listener thread,
+    so a slow or piped stdout never blocks a step. Applications with their own logging
+    configuration don't call this; importing the module configures nothing.
+    """
+    global _log_listener
+    logger.setLevel(level)
+    if _log_listener is not None:
+        return
+    log_queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = logging.handlers.QueueListener(log_queue, handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+# Screenshot and prompt sizes vary from step to step; with this the CUDA caching allocator
+# grows segments in place instead of fragmenting into one block size per shape
+CUDA_ALLOC_CONF = "expandable_segments:True,max_split_size_mb:256"
+
+# reset() hands cached allocator blocks back to the driver only once more than this is
+# reserved but unused; below it the warmed blocks are kept for the compiled model
+RELEASE_CACHED_BYTES = 2 << 30
+
+# Prompt lengths are rounded up to a multiple of this so the compiled model
+# sees a few sequence-length buckets instead of a new shape every step
+PAD_TO_MULTIPLE_OF = 64
+
+# Stand-ins for the task, step and memory/notes context when pre-rendering the prompt
+_PROMPT_SENTINELS = ("\x00task\x00", "\x00step\x00", "\x00context\x00")
+
+# Screenshot size the compiled model is warmed up with; matches the controller's default viewport
+WARMUP_VIEWPORT = (1280, 720)
+
+# Number of screenshots whose vision embeddings are kept for reuse
+VISION_CACHE_SIZE = 4
+
+# A prompt ready for generate(): its text with the image placeholder expanded, the
+# screenshot's processed pixel tensors ({} without one) and its vision-cache key
+InferenceRequest = Tuple[str, Dict[str, torch.Tensor], Any]
+
+class JsonDoneCriteria(StoppingCriteria):
+    """Stops each row once its reply has closed the top-level JSON object it opened."""
+    
+    def __init__(self, tokenizer, batch_size: int = 1):
+        self.tokenizer = tokenizer
+        self.depth = [0] * batch_size
+        self.opened = [False] * batch_size
+        self.in_string = [False] * batch_size
+        self.escaped = [False] * batch_size
+        self.closed = [False] * batch_size
+    
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        # Only the newest token is new; the brace state carries over between calls
+        for row, piece in enumerate(self.tokenizer.batch_decode(input_ids[:, -1:])):
+            if self.closed[row]:
+                continue
+            for char in piece:
+                if self.in_string[row]:
+                    if self.escaped[row]:
+                        self.escaped[row] = False
+                    elif char == "\\":
+                        self.escaped[row] = True
+                    elif char == '"':
+                        self.in_string[row] = False
+                elif char == '"' and self.opened[row]:
+                    self.in_string[row] = True
+                elif char == "{":
+                    self.depth[row] += 1
+                    self.opened[row] = True
+                elif char == "}" and self.opened[row]:
+                    self.depth[row] -= 1
+                    if self.depth[row] == 0:
+                        self.closed[row] = True
+                        break
+        return torch.tensor(self.closed, dtype=torch.bool, device=input_ids.device)
+
+
+class VisionCache(OrderedDict):
+    """
+    Vision-tower embeddings of recent screenshots, most recently used last.
+    
+    key names the screenshot(s) of the generate() about to run, None to encode
+    without caching; it is set under the agent's inference lock.
+    """
+    key = None
+
 
 class WebBrowsingAgent:
     """
@@ -19,23 +161,140 @@ class WebBrowsingAgent:
     using the Holo1 model, similar to Surfer-H architecture.
     """
     
-    def __init__(self, model_name: str = "Hcompany/Holo1-7B"):
-        """Initialize the agent with Holo1 model."""
-        print("Loading Holo1 model...")
+    def __init__(self, model_name: str = "Hcompany/Holo1-7B", compile_model: bool = True,
+                 constrained_decoding: bool = True,
+                 quantization: quant.Quantization = "bf16"):
+        """
+        Initialize the agent with Holo1 model.
+        
+        Args:
+            model_name: Hugging Face model repository
+            compile_model: Compile the forward pass with torch.compile on CUDA
+            constrained_decoding: Restrict navigation and localization output to
+                tokens that keep it valid against the NavigationStep/ClickAction schema
+            quantization: Weight format; int8 and nf4 quantize with bitsandbytes at load
+                (vision tower kept in bf16), int4-awq expects model_name to be an AWQ checkpoint
+        """
+        if quantization not in quant.QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        
+        print(f"Loading Holo1 model ({quantization})...")
+        # bf16 weights on GPU, with fused attention: FlashAttention-2 when installed,
+        # PyTorch SDPA otherwise
+        attn_implementation = "sdpa"
+        if torch.cuda.is_available() and is_flash_attn_2_available():
+            attn_implementation = "flash_attention_2"
+        load_kwargs = quant.load_kwargs(quantization, self._select_dtype())
         self.model = AutoModelForImageTextToText.from_pretrained(
             model_name,
-            torch_dtype="auto",
+            attn_implementation=attn_implementation,
             device_map="auto",
+            **load_kwargs,
         )
-        self.processor = AutoProcessor.from_pretrained(model_name)
+        quant.check_loaded(self.model, quantization, model_name)
+        # Where inputs go and what dtype pixel values need; looked up once instead of
+        # walking the parameters on every call
+        first_param = next(self.model.parameters())
+        self.device = first_param.device
+        self.model_dtype = first_param.dtype
+        
+        # The fast image processor works on tensors and can stay on the GPU
+        self.processor = AutoProcessor.from_pretrained(model_name, use_fast=True)
+        # Padding goes on the left so generation continues straight after the prompt
+        self.processor.tokenizer.padding_side = "left"
+        
         print("Model loaded successfully!")
         
+        # Copies of the agent running concurrent tasks share the model, which keeps
+        # per-call state during generate, so generation is serialized
+        self._inference_lock = threading.Lock()
+        
+        # Vision embeddings of recent screenshots, shared by the agent's copies with the model
+        self._vision_cache = VisionCache()
+        self._install_vision_cache()
+        
+        # Navigation prompt rendered once around its per-step parts; () if it can't be
+        self._navigation_template = None
+        
+        # Screenshots are downscaled to this longest edge before the processor
+        self.max_image_edge = 1280
+        self._last_scale = 1.0
+        
+        # Last screenshot, its processed pixel tensors, its downscale factor and its vision-cache key
+        self._image_cache = (None, None, 1.0, None)
+        
+        # Last encoded screenshot from the controller and its GPU-decoded tensor
+        self._screenshot_bytes = None
+        self._screenshot_tensor = None
+        
+        # Page-locked staging buffer for CPU-processed pixel tensors, reused across calls
+        # so their copy to the GPU is asynchronous without pinning fresh memory each time,
+        # and the event recorded after the last copy out of it. Per thread: agent copies
+        # sharing the model run inference from several threads at once
+        self._pinned = threading.local()
+        
+        # JSON schema parsers for lm-format-enforcer; the tokenizer's vocabulary
+        # index is built once here and shared by every constrained generate()
+        self._json_parsers = {}
+        if constrained_decoding:
+            self._tokenizer_data = build_token_enforcer_tokenizer_data(self.processor.tokenizer)
+            self._json_parsers = {
+                "navigation": JsonSchemaParser(NavigationStep.model_json_schema()),
+                "localization": JsonSchemaParser(ClickAction.model_json_schema()),
+            }
+        
+        # Compile the forward pass rather than the module: generate() looks up
+        # self.forward, so a compiled wrapper module would be bypassed. bitsandbytes
+        # layers don't trace cleanly, so quantized-at-load models stay eager
+        if compile_model and quantization in ("bf16", "int4-awq") and torch.cuda.is_available():
+            self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead", fullgraph=False)
+            self._warmup()
+        
         # Agent state
         self.current_step = 1
         self.memory = []
         self.task_notes = ""
         self.max_steps = 50
         self.scroll_count = 0
+        self._consecutive_waits = 0
+        self._wait_screenshot = None
+        
+    @staticmethod
+    def _select_dtype() -> Union[str, torch.dtype]:
+        """bf16 on CUDA (fp16 on GPUs without bf16 support), otherwise let transformers decide."""
+        if torch.cuda.is_available():
+            return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        return "auto"
+    
+    def _install_vision_cache(self):
+        """Serve repeated screenshots' vision-tower embeddings from the LRU cache instead of re-encoding."""
+        vl_model = self.model.model
+        encode_images = vl_model.get_image_features
+        cache = self._vision_cache
+        
+        # Kept out of the compiled graph: the cache lookup is plain Python state
+        @torch.compiler.disable
+        def cached_image_features(pixel_values, image_grid_thw=None):
+            key = cache.key
+            if key is not None and key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            
+            image_embeds = encode_images(pixel_values, image_grid_thw)
+            if key is not None:
+                cache[key] = image_embeds
+                if len(cache) > VISION_CACHE_SIZE:
+                    cache.popitem(last=False)
+            return image_embeds
+        
+        vl_model.get_image_features = cached_image_features
+    
+    def _warmup(self):
+        """Trace the compiled kernels on a blank screenshot before the first real step."""
+        # Goes through run_inference so the trace happens under the same
+        # inference_mode() context as every later call
+        screenshot = Image.new("RGB", WARMUP_VIEWPORT, color="white")
+        self.run_inference(get_navigation_prompt("Warm-up", screenshot, 1), screenshot, max_tokens=8)
         
     def reset(self):
         """Reset agent state for a new task."""
@@ -43,109 +302,301 @@ class WebBrowsingAgent:
         self.memory = []
         self.task_notes = ""
         self.scroll_count = 0
+        self._consecutive_waits = 0
+        self._wait_screenshot = None
         
-    def run_inference(self, messages: List[Dict[str, Any]], image: Optional[Image.Image] = None, max_tokens: int = 512) -> str:
-        """Run inference with the Holo1 model."""
+        # Hand the previous tasks' cached KV and activation blocks back to the driver once
+        # they pile up; emptying the cache every task would drop the warmed blocks
+        if torch.cuda.is_available() and self.device.type == "cuda":
+            idle = torch.cuda.memory_reserved(self.device) - torch.cuda.memory_allocated(self.device)
+            if idle > RELEASE_CACHED_BYTES:
+                gc.collect()
+                torch.cuda.empty_cache()
+        
+    def _process_image(self, image: Union[Image.Image, torch.Tensor]) -> Tuple[Dict[str, torch.Tensor], Any]:
+        """
+        Resize and normalize a screenshot, reusing the result if it is the last one processed.
+        
+        The screenshot is a PIL image or a CHW uint8 tensor (see capture_screenshot); tensors
+        are processed on their own device. Returns the pixel tensors and the screenshot's
+        vision-cache key.
+        """
+        cached_image, image_inputs, scale, key = self._image_cache
+        if cached_image is not image:
+            is_tensor = isinstance(image, torch.Tensor)
+            width, height = (image.shape[2], image.shape[1]) if is_tensor else image.size
+            
+            # Bound the longest edge: the image token count grows with the area
+            scale = 1.0
+            resized = image
+            if max(width, height) > self.max_image_edge:
+                scale = self.max_image_edge / max(width, height)
+                new_width, new_height = int(width * scale), int(height * scale)
+                if is_tensor:
+                    resized = torch.nn.functional.interpolate(
+                        image[None].float(), size=(new_height, new_width), mode="bilinear", antialias=True
+                    )[0].round_().clamp_(0, 255).to(torch.uint8)
+                else:
+                    resized = image.resize((new_width, new_height), Image.Resampling.BILINEAR)
+            image_inputs = dict(self.processor.image_processor(
+                images=[resized],
+                return_tensors="pt",
+                device=image.device if is_tensor else None,
+            ))
+            key = self._vision_key(image)
+            self._image_cache = (image, image_inputs, scale, key)
+        # Coordinates the model returns are in the downscaled image
+        self._last_scale = scale
+        return image_inputs, key
+    
+    def _vision_key(self, image: Union[Image.Image, torch.Tensor]) -> Any:
+        """Content key of a screenshot for the vision cache, or None to leave it uncached."""
+        if not isinstance(image, torch.Tensor):
+            return image.size, image.mode, xxhash.xxh3_64_intdigest(image.tobytes())
+        # A decoded screenshot is keyed by its JPEG; a tensor's id can be reused once it is freed
+        if image is self._screenshot_tensor:
+            return "jpeg", xxhash.xxh3_64_intdigest(self._screenshot_bytes)
+        return None
+        
+    def _to_device(self, inputs: BatchFeature) -> BatchFeature:
+        """
+        Move inputs to the model's device, floating-point tensors in the model's dtype.
+        
+        CPU pixel tensors go through the persistent pinned buffer, cast on the way in, so
+        the large copy is asynchronous; the token ids and mask are too small to bother.
+        """
+        pixel_values = inputs.get("pixel_values")
+        if self.device.type != "cuda" or pixel_values is None or pixel_values.device.type != "cpu":
+            return inputs.to(device=self.device, dtype=self.model_dtype, non_blocking=True)
+        
+        pinned = self._pinned
+        # The previous copy out of the buffer must finish before it is overwritten
+        copied = getattr(pinned, "copied", None)
+        if copied is not None:
+            copied.synchronize()
+        numel = pixel_values.numel()
+        buffer = getattr(pinned, "pixels", None)
+        if buffer is None or buffer.numel() < numel:
+            buffer = pinned.pixels = torch.empty(numel, dtype=self.model_dtype, pin_memory=True)
+        staged = buffer[:numel].view(pixel_values.shape)
+        staged.copy_(pixel_values)
+        
+        inputs = BatchFeature(data={**inputs, "pixel_values": staged})
+        inputs = inputs.to(device=self.device, dtype=self.model_dtype, non_blocking=True)
+        pinned.copied = torch.cuda.Event()
+        pinned.copied.record()
+        return inputs
+    
+    def run_inference(self, messages: Union[str, List[Dict[str, Any]]], image: Optional[Image.Image] = None, max_tokens: int = 512,
+                      deterministic: bool = True, schema: Optional[str] = None) -> str:
+        """
+        Run inference with the Holo1 model; greedy unless deterministic is False (sampling at temperature 0.7).
+        
+        messages may also be the prompt already rendered through the chat template.
+        schema ("navigation" or "localization") constrains the output to that JSON schema
+        when constrained decoding is enabled.
+        """
         try:
-            # Prepare the text input
+            request = self.prepare_inference(messages, image)
+        except Exception as e:
+            logger.error("Inference error: %s", e)
+            return ""
+        return self.run_inference_batch([request], max_tokens, deterministic, schema)[0]
+    
+    def prepare_inference(self, messages: Union[str, List[Dict[str, Any]]],
+                          image: Optional[Union[Image.Image, torch.Tensor]] = None) -> InferenceRequest:
+        """
+        Turn a conversation and its (optional) screenshot into a request for run_inference_batch.
+        
+        The screenshot's pixel tensors are reused across calls on it, and its downscale
+        factor is kept for mapping the reply's coordinates back to the page.
+        """
+        # Prepare the text input
+        if isinstance(messages, str):
+            text = messages
+        else:
             text = self.processor.apply_chat_template(
                 messages, 
                 tokenize=False, 
                 add_generation_prompt=True
             )
-            
-            # Process inputs
-            inputs = self.processor(
-                text=[text],
-                images=[image] if image else None,
+        
+        if image is None:
+            return text, {}, None
+        image_inputs, key = self._process_image(image)
+        # Expand the image placeholder to one pad token per merged patch, as the processor does
+        merge_length = self.processor.image_processor.merge_size ** 2
+        num_image_tokens = int(image_inputs["image_grid_thw"][0].prod()) // merge_length
+        image_token = self.processor.image_token
+        return text.replace(image_token, image_token * num_image_tokens, 1), image_inputs, key
+    
+    def run_inference_batch(self, requests: List[InferenceRequest], max_tokens: int = 512,
+                            deterministic: bool = True, schema: Optional[str] = None) -> List[str]:
+        """
+        Run one generate() over several prepared requests (see prepare_inference).
+        
+        Requests may come from different copies of the agent; they share the model.
+        Returns one reply per request, "" for all of them if inference fails.
+        """
+        try:
+            # Prompts are left-padded, so every row's completion starts at the same column
+            text_inputs = self.processor.tokenizer(
+                [text for text, _, _ in requests],
                 padding=True,
+                pad_to_multiple_of=PAD_TO_MULTIPLE_OF,
                 return_tensors="pt",
             )
+            inputs = BatchFeature(data=dict(text_inputs))
+            image_inputs = [image_inputs for _, image_inputs, _ in requests if image_inputs]
+            if image_inputs:
+                inputs["pixel_values"] = torch.cat([i["pixel_values"] for i in image_inputs])
+                inputs["image_grid_thw"] = torch.cat([i["image_grid_thw"] for i in image_inputs])
+            
+            # The batch's embeddings are cached under all of its screenshots' keys together
+            keys = [key for _, image_inputs, key in requests if image_inputs]
+            vision_key = None
+            if keys and None not in keys:
+                vision_key = keys[0] if len(keys) == 1 else tuple(keys)
             
-            # Move to device
-            device = next(self.model.parameters()).device
-            inputs = inputs.to(device)
+            # Move to device, with pixel_values in the model's dtype
+            inputs = self._to_device(inputs)
             
-            # Generate response
-            with torch.no_grad():
+            # Generate response; the JSON callers want greedy output, which also
+            # avoids malformed replies from sampling
+            if deterministic:
+                sampling_kwargs = {"do_sample": False, "num_beams": 1, "temperature": None, "top_p": None}
+            else:
+                sampling_kwargs = {"do_sample": True, "temperature": 0.7}
+            if schema is not None:
+                # A JSON reply is complete once its object closes; don't decode up to max_tokens
+                sampling_kwargs["stopping_criteria"] = StoppingCriteriaList([
+                    JsonDoneCriteria(self.processor.tokenizer, len(requests))
+                ])
+            if schema in self._json_parsers:
+                # The enforcer keeps per-sequence state, so each call gets a fresh one
+                sampling_kwargs["prefix_allowed_tokens_fn"] = build_transformers_prefix_allowed_tokens_fn(
+                    self._tokenizer_data, self._json_parsers[schema]
+                )
+            with self._inference_lock, torch.inference_mode():
+                self._vision_cache.key = vision_key
                 generated_ids = self.model.generate(
                     **inputs, 
                     max_new_tokens=max_tokens,
-                    temperature=0.7,
-                    do_sample=True,
-                    pad_token_id=self.processor.tokenizer.eos_token_id
+                    pad_token_id=self.processor.tokenizer.eos_token_id,
+                    **sampling_kwargs
                 )
             
-            # Decode response
-            generated_ids_trimmed = [
-                out_ids[len(in_ids):] 
-                for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-            ]
-            
-            response = self.processor.batch_decode(
-                generated_ids_trimmed, 
+            # Decode responses; prompts are left-padded, so completions start at the prompt length
+            prompt_len = inputs.input_ids.shape[1]
+            responses = self.processor.tokenizer.batch_decode(
+                generated_ids[:, prompt_len:], 
                 skip_special_tokens=True, 
                 clean_up_tokenization_spaces=False
-            )[0]
+            )
             
-            return response.strip()
+            return [response.strip() for response in responses]
             
         except Exception as e:
-            print(f"Inference error: {e}")
-            return ""
+            logger.error("Inference error: %s", e)
+            return [""] * len(requests)
+    
+    def _render_navigation_prompt(self, task: str, step: Any, context: str) -> str:
+        """Render the navigation prompt, with memory/notes context before </observation>."""
+        messages = get_navigation_prompt(task, None, step)
+        messages[1]["content"].insert(-1, {"type": "text", "text": context})
+        return self.processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    
+    def _split_navigation_template(self) -> Optional[tuple]:
+        """Split the rendered prompt into the literal text around task, step and context."""
+        template = self._render_navigation_prompt(*_PROMPT_SENTINELS)
+        segments = []
+        for sentinel in _PROMPT_SENTINELS:
+            if template.count(sentinel) != 1:
+                return None
+            head, template = template.split(sentinel)
+            segments.append(head)
+        segments.append(template)
+        
+        # Check the spliced text against a real render once before trusting it
+        sample = ("task", 1, "<memory>\nStep 1: thought\n</memory>\n")
+        if self._join_navigation_segments(segments, *sample) != self._render_navigation_prompt(*sample):
+            logger.warning("Chat template is not static; rendering the navigation prompt per step")
+            return None
+        return tuple(segments)
+    
+    @staticmethod
+    def _join_navigation_segments(segments, task: str, step: Any, context: str) -> str:
+        return "".join((segments[0], task, segments[1], str(step), segments[2], context, segments[3]))
+    
+    def _navigation_text(self, task: str, step: int, context: str) -> str:
+        """The navigation prompt text, spliced from the template rendered on the first call."""
+        if self._navigation_template is None:
+            self._navigation_template = self._split_navigation_template() or ()
+        if not self._navigation_template:
+            return self._render_navigation_prompt(task, step, context)
+        return self._join_navigation_segments(self._navigation_template, task, step, context)
     
     def navigate(self, task: str, screenshot: Image.Image) -> NavigationStep:
         """
         Perform navigation reasoning given a task and screenshot.
         """
-        # Create navigation prompt
-        messages = get_navigation_prompt(task, screenshot, self.current_step)
+        # Get response from model
+        response = self.run_inference(self._navigation_prompt(task), screenshot, max_tokens=1024,
+                                      deterministic=True, schema="navigation")
+        return self._parse_navigation(response)
+    
+    async def navigate_async(self, task: str, screenshot: Image.Image, batch_queue: "BatchQueue") -> NavigationStep:
+        """Like navigate, with the model call batched through batch_queue alongside other tasks' steps."""
+        try:
+            request = await asyncio.to_thread(self.prepare_inference, self._navigation_prompt(task), screenshot)
+            response = await batch_queue.submit(request, max_tokens=1024, schema="navigation")
+        except Exception as e:
+            logger.error("Inference error: %s", e)
+            response = ""
+        return self._parse_navigation(response)
+    
+    def _navigation_prompt(self, task: str) -> str:
+        """The navigation prompt for the current step, with memory and notes, already rendered."""
+        context = ""
         
         # Add memory context if available
         if self.memory:
             memory_context = "\n".join([
                 f"Step {i+1}: {step}" for i, step in enumerate(self.memory[-5:])  # Last 5 steps
             ])
-            messages[1]["content"].insert(-1, {
-                "type": "text", 
-                "text": f"<memory>\n{memory_context}\n</memory>\n"
-            })
+            context += f"<memory>\n{memory_context}\n</memory>\n"
         
         # Add current notes if available
         if self.task_notes:
-            messages[1]["content"].insert(-1, {
-                "type": "text",
-                "text": f"<current_notes>\n{self.task_notes}\n</current_notes>\n"
-            })
+            context += f"<current_notes>\n{self.task_notes}\n</current_notes>\n"
         
-        # Get response from model
-        response = self.run_inference(messages, screenshot, max_tokens=1024)
+        return self._navigation_text(task, self.current_step, context)
+    
+    def _parse_navigation(self, response: str) -> NavigationStep:
+        """Turn the model's reply into a NavigationStep, falling back to a wait on failure."""
+        # Strip a markdown fence if present
+        fence = _FENCE.match(response)
+        if fence:
+            response = fence.group(1)
         
         try:
-            # Parse JSON response
-            if response.startswith("```json"):
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif response.startswith("```"):
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            step_data = json.loads(response)
-            navigation_step = NavigationStep(**step_data)
-            
-            # Update task notes if new information is available
-            if navigation_step.note and navigation_step.note.strip():
-                self.task_notes += f"\nStep {self.current_step}: {navigation_step.note}"
-            
-            return navigation_step
-            
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"Error parsing navigation response: {e}")
-            print(f"Raw response: {response}")
+            # Parse and validate in one pass in pydantic's Rust core
+            navigation_step = _NAV_ADAPTER.validate_json(response)
+        except ValidationError as e:
+            logger.error("Error parsing navigation response: %s", e)
+            logger.info("Raw response: %s", response)
             # Return a default wait action
             return NavigationStep(
                 note="",
                 thought="Failed to parse response, waiting before retry",
                 action={"action": "wait", "seconds": 2}
             )
+        
+        # Update task notes if new information is available
+        if navigation_step.note and navigation_step.note.strip():
+            self.task_notes += f"\nStep {self.current_step}: {navigation_step.note}"
+        
+        return navigation_step
     
     def localize_element(self, screenshot: Image.Image, instruction: str) -> Optional[ClickAction]:
         """
@@ -153,21 +604,20 @@ class WebBrowsingAgent:
         """
         messages = get_localization_prompt_structured_output(screenshot, instruction)
         
-        response = self.run_inference(messages, screenshot, max_tokens=256)
+        response = self.run_inference(messages, screenshot, max_tokens=256, deterministic=True, schema="localization")
         
         try:
-            # Parse JSON response
-            if response.startswith("```json"):
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif response.startswith("```"):
-                response = response.split("```")[1].split("```")[0].strip()
+            # Parse JSON response, stripping a markdown fence if present
+            fence = _FENCE.match(response)
+            if fence:
+                response = fence.group(1)
                 
-            click_data = json.loads(response)
+            click_data = from_json(response)
             return ClickAction(**click_data)
             
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"Error parsing localization response: {e}")
-            print(f"Raw response: {response}")
+        except Exception as e:
+            logger.error("Error parsing localization response: %s", e)
+            logger.info("Raw response: %s", response)
             return None
     
     def execute_step(self, task: str, screenshot: Image.Image, browser_controller) -> Dict[str, Any]:
@@ -189,51 +639,176 @@ class WebBrowsingAgent:
                 "final_answer": self.task_notes
             }
         
+        # Asking the model again right after a wait on the same screenshot would most
+        # likely just wait again; back off without decoding
+        delay = self._wait_backoff(screenshot)
+        if delay is not None:
+            time.sleep(delay)
+            return self._backoff_result(delay)
+        
         # Get navigation decision
         nav_step = self.navigate(task, screenshot)
-        
-        # Log the step
-        step_log = f"Step {self.current_step}: {nav_step.thought}"
-        self.memory.append(step_log)
-        print(f"\n{step_log}")
-        print(f"Action: {nav_step.action}")
+        self._log_step(nav_step)
+        self._track_waits(nav_step, screenshot)
         
         # Execute the action
         try:
             action_result = self._execute_action(nav_step.action, screenshot, browser_controller)
+            return self._step_result(nav_step, action_result)
             
-            # Update step counter
-            self.current_step += 1
-            
-            # Check if this is the final answer
-            action_type = nav_step.action.action if hasattr(nav_step.action, 'action') else nav_step.action.get("action")
-            if action_type == "answer":
-                final_content = nav_step.action.content if hasattr(nav_step.action, 'content') else nav_step.action.get("content", self.task_notes)
-                return {
-                    "status": "completed",
-                    "message": "Task completed successfully",
-                    "final_answer": final_content,
-                    "total_steps": self.current_step - 1
-                }
-            
+        except Exception as e:
+            logger.error("Error executing action: %s", e)
+            return {
+                "status": "error",
+                "message": str(e),
+                "step": self.current_step
+            }
+    
+    async def execute_step_async(self, task: str, screenshot: Image.Image, browser_controller,
+                                 batch_queue: Optional["BatchQueue"] = None) -> Dict[str, Any]:
+        """
+        Like execute_step, for an async browser controller (e.g. AsyncPlaywrightBrowserController).
+        
+        Inference runs in a worker thread so the event loop, and other tasks' browser
+        work, keep going while the model decodes. With a batch_queue, the navigation
+        call is batched with other concurrent tasks' steps instead.
+        """
+        if self.current_step > self.max_steps:
             return {
-                "status": "continuing",
-                "step": self.current_step - 1,
-                "action": nav_step.action,
-                "result": action_result,
-                "notes": nav_step.note
+                "status": "max_steps_reached",
+                "message": "Maximum steps reached",
+                "final_answer": self.task_notes
             }
+        
+        delay = self._wait_backoff(screenshot)
+        if delay is not None:
+            await asyncio.sleep(delay)
+            return self._backoff_result(delay)
+        
+        # Get navigation decision
+        if batch_queue is None:
+            nav_step = await asyncio.to_thread(self.navigate, task, screenshot)
+        else:
+            nav_step = await self.navigate_async(task, screenshot, batch_queue)
+        self._log_step(nav_step)
+        self._track_waits(nav_step, screenshot)
+        
+        # Execute the action
+        try:
+            action_result = await self._execute_action_async(nav_step.action, browser_controller)
+            return self._step_result(nav_step, action_result)
             
         except Exception as e:
-            print(f"Error executing action: {e}")
+            logger.error("Error executing action: %s", e)
             return {
                 "status": "error",
                 "message": str(e),
                 "step": self.current_step
             }
     
+    @staticmethod
+    def _screenshot_key(screenshot: Union[Image.Image, torch.Tensor]) -> Any:
+        """Content key of a screenshot; decoded tensors are reused while the page is unchanged."""
+        if isinstance(screenshot, torch.Tensor):
+            return id(screenshot)
+        return screenshot.size, xxhash.xxh3_64_intdigest(screenshot.tobytes())
+    
+    def _track_waits(self, nav_step: NavigationStep, screenshot: Union[Image.Image, torch.Tensor]):
+        """Count consecutive wait actions and remember the screenshot the last one was chosen on."""
+        action = nav_step.action
+        action_type = action.action if hasattr(action, 'action') else action.get("action")
+        if action_type != "wait":
+            self._consecutive_waits = 0
+            self._wait_screenshot = None
+            return
+        self._consecutive_waits += 1
+        # Keep the screenshot itself alive too, so a tensor's id can't be reused
+        self._wait_screenshot = (screenshot, self._screenshot_key(screenshot))
+    
+    def _wait_backoff(self, screenshot: Union[Image.Image, torch.Tensor]) -> Optional[float]:
+        """Backoff delay if the last step waited on this same screenshot, else None."""
+        if self._wait_screenshot is None or self._screenshot_key(screenshot) != self._wait_screenshot[1]:
+            return None
+        # Back off once per wait; the step after this one asks the model again
+        self._wait_screenshot = None
+        return min(2 ** self._consecutive_waits, 30)
+    
+    def _backoff_result(self, delay: float) -> Dict[str, Any]:
+        """Result of a step spent backing off instead of running the model."""
+        logger.info("Step %d: page unchanged after wait, backing off %ss", self.current_step, delay)
+        self.current_step += 1
+        return {
+            "status": "continuing",
+            "step": self.current_step - 1,
+            "action": {"action": "wait", "seconds": delay},
+            "result": f"Waited {delay} seconds",
+            "notes": ""
+        }
+    
+    def _log_step(self, nav_step: NavigationStep):
+        """Record the step's thought in memory and log it."""
+        step_log = f"Step {self.current_step}: {nav_step.thought}"
+        self.memory.append(step_log)
+        logger.info("%s", step_log)
+        logger.info("Action: %s", nav_step.action)
+    
+    def _step_result(self, nav_step: NavigationStep, action_result: str) -> Dict[str, Any]:
+        """Advance the step counter and build the step's result after its action ran."""
+        # Update step counter
+        self.current_step += 1
+        
+        # Check if this is the final answer
+        action_type = nav_step.action.action if hasattr(nav_step.action, 'action') else nav_step.action.get("action")
+        if action_type == "answer":
+            final_content = nav_step.action.content if hasattr(nav_step.action, 'content') else nav_step.action.get("content", self.task_notes)
+            return {
+                "status": "completed",
+                "message": "Task completed successfully",
+                "final_answer": final_content,
+                "total_steps": self.current_step - 1
+            }
+        
+        return {
+            "status": "continuing",
+            "step": self.current_step - 1,
+            "action": nav_step.action,
+            "result": action_result,
+            "notes": nav_step.note
+        }
+    
+    def _to_page_coords(self, x: int, y: int) -> tuple:
+        """Map coordinates from the downscaled screenshot the model saw back to the page."""
+        if self._last_scale == 1.0:
+            return x, y
+        return round(x / self._last_scale), round(y / self._last_scale)
+    
     def _execute_action(self, action: ActionSpace, screenshot: Image.Image, browser_controller) -> str:
         """Execute a specific action using the browser controller."""
+        calls, result = self._plan_action(action)
+        for method, args in calls:
+            if method == "sleep":
+                time.sleep(*args)
+            else:
+                getattr(browser_controller, method)(*args)
+        return result
+    
+    async def _execute_action_async(self, action: ActionSpace, browser_controller) -> str:
+        """Execute a specific action using an async browser controller."""
+        calls, result = self._plan_action(action)
+        for method, args in calls:
+            if method == "sleep":
+                await asyncio.sleep(*args)
+            else:
+                await getattr(browser_controller, method)(*args)
+        return result
+    
+    def _plan_action(self, action: ActionSpace) -> Tuple[List[Tuple[str, tuple]], str]:
+        """
+        Turn an action into browser controller calls and the step's result message.
+        
+        Calls are (method name, args) pairs, "sleep" being a pause of args[0] seconds, so
+        sync and async controllers run the same plan.
+        """
         # Handle both dict and Pydantic model formats
         if hasattr(action, 'action'):
             # Pydantic model format
@@ -250,8 +825,8 @@ class WebBrowsingAgent:
             else:
                 x, y = action.get("x"), action.get("y")
                 element = action.get("element", "Unknown element")
-            browser_controller.click(x, y)
-            return f"Clicked on '{element}' at coordinates ({x}, {y})"
+            x, y = self._to_page_coords(x, y)
+            return [("click", (x, y))], f"Clicked on '{element}' at coordinates ({x}, {y})"
             
         elif action_type == "write_element_abs":
             # Write text at specified coordinates
@@ -263,10 +838,10 @@ class WebBrowsingAgent:
                 x, y = action.get("x"), action.get("y")
                 content = action.get("content", "")
                 element = action.get("element", "Unknown element")
-            browser_controller.click(x, y)  # Focus the element first
-            time.sleep(0.5)
-            browser_controller.type_text(content)
-            return f"Wrote '{content}' in '{element}' at coordinates ({x}, {y})"
+            x, y = self._to_page_coords(x, y)
+            # Focus the element first
+            calls = [("click", (x, y)), ("sleep", (0.5,)), ("type_text", (content,))]
+            return calls, f"Wrote '{content}' in '{element}' at coordinates ({x}, {y})"
             
         elif action_type == "scroll":
             if hasattr(action, 'direction'):
@@ -275,48 +850,84 @@ class WebBrowsingAgent:
                 direction = action.get("direction", "down")
             self.scroll_count += 1
             if self.scroll_count > 3:
-                return "Scroll limit reached, skipping scroll action"
-            browser_controller.scroll(direction)
-            return f"Scrolled {direction}"
+                return [], "Scroll limit reached, skipping scroll action"
+            return [("scroll", (direction,))], f"Scrolled {direction}"
             
         elif action_type == "go_back":
-            browser_controller.go_back()
-            return "Navigated back"
+            return [("go_back", ())], "Navigated back"
             
         elif action_type == "refresh":
-            browser_controller.refresh()
-            return "Refreshed page"
+            return [("refresh", ())], "Refreshed page"
             
         elif action_type == "goto":
             if hasattr(action, 'url'):
                 url = action.url
             else:
                 url = action.get("url", "")
-            browser_controller.goto(url)
-            return f"Navigated to {url}"
+            return [("goto", (url,))], f"Navigated to {url}"
             
         elif action_type == "wait":
             if hasattr(action, 'seconds'):
                 seconds = action.seconds
             else:
                 seconds = action.get("seconds", 2)
-            time.sleep(seconds)
-            return f"Waited {seconds} seconds"
+            return [("sleep", (seconds,))], f"Waited {seconds} seconds"
             
         elif action_type == "restart":
             self.reset()
-            browser_controller.restart()
-            return "Restarted task"
+            return [("restart", ())], "Restarted task"
             
         elif action_type == "answer":
             # This is handled in execute_step
             if hasattr(action, 'content'):
-                return f"Task completed: {action.content}"
+                return [], f"Task completed: {action.content}"
             else:
-                return "Task completed"
+                return [], "Task completed"
             
         else:
-            return f"Unknown action type: {action_type}"
+            return [], f"Unknown action type: {action_type}"
+    
+    def capture_screenshot(self, browser_controller) -> Union[Image.Image, torch.Tensor]:
+        """
+        Current screenshot for the agent loop.
+        
+        On CUDA, when the controller provides the encoded JPEG, it is decoded straight into
+        a GPU tensor so the frame never goes through PIL; otherwise this is get_screenshot().
+        """
+        if self.device.type != "cuda":
+            return browser_controller.get_screenshot()
+        try:
+            return self._decode_screenshot(browser_controller.get_screenshot_bytes(fmt="jpeg"))
+        except (AttributeError, NotImplementedError):
+            return browser_controller.get_screenshot()
+        except Exception as e:
+            # A controller-specific encoder failure or an undecodable JPEG costs
+            # the fast path, not the step
+            logger.warning("GPU screenshot path failed, falling back to get_screenshot: %s", e)
+            return browser_controller.get_screenshot()
+    
+    async def capture_screenshot_async(self, browser_controller) -> Union[Image.Image, torch.Tensor]:
+        """Like capture_screenshot, for an async browser controller."""
+        if self.device.type != "cuda" or not hasattr(browser_controller, "get_screenshot_bytes"):
+            return await browser_controller.get_screenshot()
+        try:
+            return self._decode_screenshot(await browser_controller.get_screenshot_bytes(fmt="jpeg"))
+        except Exception as e:
+            logger.warning("GPU screenshot path failed, falling back to get_screenshot: %s", e)
+            return await browser_controller.get_screenshot()
+    
+    def _decode_screenshot(self, screenshot_bytes: bytes) -> torch.Tensor:
+        """Decode an encoded JPEG screenshot on the GPU."""
+        # The controller hands back the same bytes while the page is unchanged; keep the
+        # decoded tensor too so the processed-image cache still hits
+        if screenshot_bytes is not self._screenshot_bytes:
+            self._screenshot_bytes = screenshot_bytes
+            self._screenshot_tensor = decode_jpeg(
+                torch.frombuffer(bytearray(screenshot_bytes), dtype=torch.uint8),
+                mode=ImageReadMode.RGB,
+                device=self.device,
+            )
+        return self._screenshot_tensor
     
     def run_task(self, task: str, browser_controller, max_steps: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -334,11 +945,11 @@ class WebBrowsingAgent:
             self.max_steps = max_steps
             
         self.reset()
-        print(f"Starting task: {task}")
+        logger.info("Starting task: %s", task)
         
         while self.current_step <= self.max_steps:
             # Get current screenshot
-            screenshot = browser_controller.get_screenshot()
+            screenshot = self.capture_screenshot(browser_controller)
             
             # Execute one step
             result = self.execute_step(task, screenshot, browser_controller)
@@ -356,6 +967,52 @@ class WebBrowsingAgent:
             "total_steps": self.current_step - 1
         }
     
+    async def run_task_async(self, task: str, browser_controller, max_steps: Optional[int] = None,
+                             batch_queue: Optional["BatchQueue"] = None) -> Dict[str, Any]:
+        """
+        Run a complete browsing task with an async browser controller.
+        
+        Inference runs in a worker thread and browser work is awaited, so tasks sharing
+        the event loop overlap their page loads with each other's decoding. Instead of a
+        fixed one-second pause, each step waits for the page's DOM to be loaded before
+        the next screenshot.
+        
+        Args:
+            task: Task description
+            browser_controller: Async browser controller, e.g. AsyncPlaywrightBrowserController
+            max_steps: Maximum number of steps (optional)
+            batch_queue: BatchQueue over this agent's model, to batch navigation with
+                other tasks running concurrently on copies of the agent (optional)
+            
+        Returns:
+            Final result dictionary
+        """
+        if max_steps:
+            self.max_steps = max_steps
+            
+        self.reset()
+        logger.info("Starting task: %s", task)
+        
+        while self.current_step <= self.max_steps:
+            screenshot = await self.capture_screenshot_async(browser_controller)
+            
+            # Execute one step
+            result = await self.execute_step_async(task, screenshot, browser_controller, batch_queue)
+            
+            if result["status"] in ["completed", "error", "max_steps_reached"]:
+                return result
+            
+            # Let the action's navigation or re-render reach the parsed DOM; unlike
+            # networkidle, long-polling pages still get there
+            await browser_controller.wait_for_page_load(state="domcontentloaded")
+        
+        return {
+            "status": "max_steps_reached",
+            "message": "Task did not complete within maximum steps",
+            "final_answer": self.task_notes,
+            "total_steps": self.current_step - 1
+        }
+    
     def interactive_mode(self, browser_controller):
         """
         Run the agent in interactive mode for testing and debugging.
@@ -411,6 +1068,89 @@ class WebBrowsingAgent:
                 print(f"Error: {e}")
 
 
+class BatchQueue:
+    """
+    Coalesces inference requests from concurrent tasks into batched generate() calls.
+    
+    Requests arriving within window seconds of the first one are flushed together
+    (up to max_batch), as batched inference servers do. The tasks run on copies of
+    agent, which share its model.
+    """
+    
+    def __init__(self, agent: WebBrowsingAgent, window: float = 0.02, max_batch: int = 8):
+        self.agent = agent
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = asyncio.Queue()
+        self._worker = None
+    
+    async def submit(self, request: InferenceRequest, max_tokens: int = 512, schema: Optional[str] = None) -> str:
+        """Queue one request (see WebBrowsingAgent.prepare_inference) and wait for its reply."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, max_tokens, schema, future))
+        return await future
+    
+    async def close(self):
+        """Stop the flush loop and cancel every request still waiting on it."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while not self._queue.empty():
+            self._queue.get_nowait()[3].cancel()
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                await self._flush(loop, batch)
+            except asyncio.CancelledError:
+                # The batch is off the queue, so close() can't reach its submitters
+                for request in batch:
+                    request[3].cancel()
+                raise
+            except Exception as e:
+                for request in batch:
+                    if not request[3].done():
+                        request[3].set_exception(e)
+    
+    async def _flush(self, loop, batch):
+        """Collect more requests into batch for up to the window, then answer them all."""
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        # One generate() per max_tokens and schema; usually every request shares them
+        groups = {}
+        for request in batch:
+            groups.setdefault(request[1:3], []).append(request)
+        for (max_tokens, schema), requests in groups.items():
+            responses = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    self.agent.run_inference_batch,
+                    [r[0] for r in requests],
+                    max_tokens,
+                    schema=schema,
+                ),
+            )
+            for request, response in zip(requests, responses):
+                if not request[3].done():
+                    request[3].set_result(response)
+
+
 # Example browser controller interface (you'll need to implement this)
 class BrowserController:
     """
@@ -423,6 +1163,10 @@ class BrowserController:
         """Get current screenshot as PIL Image."""
         raise NotImplementedError
         
+    def get_screenshot_bytes(self, fmt: str = "jpeg") -> bytes:
+        """Get current screenshot as encoded bytes (optional; lets the agent decode on the GPU)."""
+        raise NotImplementedError
+        
     def click(self, x: int, y: int):
         """Click at coordinates (x, y)."""
         raise NotImplementedError
@@ -454,6 +1198,9 @@ class BrowserController:
 
 # Example usage
 if __name__ == "__main__":
+    configure_cuda_allocator()
+    configure_logging()
+    
     # Initialize the agent
     agent = WebBrowsingAgent()
     
@@ -0,0 +1,60 @@
+import atexit
+import io
+
+from PIL import Image
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+
+class ScreenshotService:
+    """Takes page screenshots with one Chrome instance shared by every caller.
+
+    The driver is started on first use and quit at interpreter exit, so only
+    the first capture pays Chrome's start-up cost.
+    """
+
+    _driver = None
+    # URL passed to the last get() and where the tab ended up after it, redirects included
+    _requested_url = None
+    _loaded_url = None
+
+    @classmethod
+    def driver(cls):
+        if cls._driver is None:
+            options = Options()
+            options.add_argument("--headless=new")  # Don't open a window
+            options.add_argument("--disable-gpu")
+            cls._driver = webdriver.Chrome(options=options)
+            atexit.register(cls.close)
+        return cls._driver
+
+    @classmethod
+    def close(cls):
+        if cls._driver is not None:
+            cls._driver.quit()
+            cls._driver = None
+            cls._requested_url = cls._loaded_url = None
+
+    @classmethod
+    def capture(cls, url, reuse_page=False):
+        """PNG bytes of url; with reuse_page, skip reloading when the tab is still where url led."""
+        driver = cls.driver()
+        # Compare against the last request rather than current_url, which the browser
+        # normalizes ("https://google.com" loads as "https://www.google.com/")
+        if not (reuse_page and url == cls._requested_url and driver.current_url == cls._loaded_url):
+            driver.get(url)
+            cls._requested_url = url
+            cls._loaded_url = driver.current_url
+        return driver.get_screenshot_as_png()
+
+    @classmethod
+    def capture_image(cls, url, reuse_page=False):
+        """Like capture, decoded into a PIL image in memory."""
+        screenshot = Image.open(io.BytesIO(cls.capture(url, reuse_page)))
+        screenshot.load()
+        return screenshot
+
+
+if __name__ == "__main__":
+    screenshot = ScreenshotService.capture_image("https://google.com")
+    print(f"Captured {screenshot.size[0]}x{screenshot.size[1]} screenshot")